@@ -6,6 +6,14 @@ from fastapi.staticfiles import StaticFiles
 import json
 import os
 from datetime import datetime
+from functools import lru_cache
+from fastapi import HTTPException
+from backend.coldrag.utils.plan_index import PlanIndex
+from backend.coldrag.utils.plan_columns import PlanColumns, write_plan_columns, file_sha256
+from backend.coldrag.utils.plan_model import TerraformPlan
+from backend.coldrag.train.embedding_cache import EmbeddingCache
+from backend.coldrag.daemon.client import DaemonClient, retrieval_client
+from backend.coldrag.daemon.protocol import decode_vectors
 
 
 # ✅ Create app first
@@ -42,10 +50,130 @@ class RAGResponse(BaseModel):
     analysis: Optional[dict] = None
     compliance_violations: Optional[List[ComplianceViolation]] = None
 
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    kind: str = "doc"  # 'doc' or 'query'
+    model_path: Optional[str] = None
+
+class SearchRequest(BaseModel):
+    query: str
+    refdir: str
+    k: int = 10
+    mode: str = "vector"  # 'vector' or 'lexical' (BM25)
+    model_path: Optional[str] = None
+
 @app.get("/")
 def root():
     return {"message": "BizOpsAgent FastAPI is live 🎯"}
 
+@lru_cache(maxsize=8)
+def cached_plan_index(plan_json: str, mtime: float) -> PlanIndex:
+    """Index a plan once per file version; mtime is part of the key so edits invalidate it."""
+    # Same cached model as /plan/summary and the inspector: the JSON is not parsed again
+    return TerraformPlan.load(plan_json).index
+
+@app.get("/plan/query")
+def plan_query(plan_json: str, path: str, value: Optional[str] = None,
+               missing: bool = False, resource_type: Optional[str] = None):
+    """Attribute lookups, e.g. ?path=ingress.cidr_blocks&value=0.0.0.0/0 or ?path=kms_key_id&missing=true"""
+    if not os.path.isfile(plan_json):
+        raise HTTPException(status_code=404, detail=f"Plan JSON not found: {plan_json}")
+    index = cached_plan_index(plan_json, os.path.getmtime(plan_json))
+    matches = index.query(path, value, missing=missing, resource_type=resource_type)
+    return {
+        "path": path,
+        "value": value,
+        "missing": missing,
+        "resource_type": resource_type,
+        "count": len(matches),
+        "resources": sorted(matches),
+    }
+
+@lru_cache(maxsize=8)
+def cached_plan_columns(plan_json: str, mtime: float) -> PlanColumns:
+    """Memory-map the plan's column cache, building it when missing or written for another plan version."""
+    columns = PlanColumns.open(plan_json)
+    if columns is None:
+        # TerraformPlan.load may come from the pickled model or run with COLUMN_CACHE=false: write explicitly.
+        # Hashed before loading, so a plan replaced meanwhile fails verification below.
+        source_hash = file_sha256(plan_json)
+        write_plan_columns(TerraformPlan.load(plan_json).records, plan_json, source_hash=source_hash)
+        columns = PlanColumns.open(plan_json)
+    if columns is None:
+        raise HTTPException(status_code=409, detail=f"Plan JSON changed while building its column cache: {plan_json}")
+    return columns
+
+@app.get("/plan/summary")
+def plan_summary(plan_json: str, action: Optional[str] = None, resource_type: Optional[str] = None,
+                 module_address: Optional[str] = None, limit: int = 100):
+    """Filtered counts/cost aggregates over the columnar plan cache (no JSON decoding)."""
+    if not os.path.isfile(plan_json):
+        raise HTTPException(status_code=404, detail=f"Plan JSON not found: {plan_json}")
+    columns = cached_plan_columns(plan_json, os.path.getmtime(plan_json))
+    filters = {"action": action, "resource_type": resource_type, "module_address": module_address}
+    rows = columns.select(**filters)
+    return {
+        "total": len(columns),
+        "matched": int(len(rows)),
+        "by_type": columns.counts("resource_type", **filters),
+        "by_action": columns.counts("action", **filters),
+        "by_module": columns.counts("module_address", **filters),
+        "cost_by_type": columns.cost_by("resource_type", **filters),
+        "resources": [columns.row(int(i)) for i in rows[:limit]],
+    }
+
+@app.get("/embeddings/cache")
+def embedding_cache_stats(model_path: Optional[str] = None):
+    """Lifetime hit/miss counters and size of the shared embedding cache."""
+    from backend.coldrag.train.embedding_setup import EMBEDDING_MODEL, embedding_model_id
+    # Keyed like create_embeddings(); opened per request (SQLite connections are per thread)
+    cache = EmbeddingCache(embedding_model_id(model_path or EMBEDDING_MODEL))
+    try:
+        return cache.stats()
+    finally:
+        cache.close()
+
+def embedding_backend(model_path: Optional[str]):
+    """The embedding daemon when it is running, else a service kept warm inside this process."""
+    from backend.coldrag.train.embedding_setup import EMBEDDING_MODEL
+    return retrieval_client(model_path or EMBEDDING_MODEL)
+
+@app.post("/embed")
+def embed(payload: EmbedRequest):
+    client = embedding_backend(payload.model_path)
+    vectors = decode_vectors(client.call("embed", texts=payload.texts, kind=payload.kind)["vectors"])
+    return {"count": len(vectors), "dim": int(vectors.shape[1]) if len(vectors) else 0,
+            "daemon": isinstance(client, DaemonClient), "vectors": vectors.tolist()}
+
+@app.post("/search")
+def search(payload: SearchRequest):
+    """Top-k reference chunks for a query, by embedding similarity or BM25."""
+    if not os.path.isdir(payload.refdir):
+        raise HTTPException(status_code=404, detail=f"Reference directory not found: {payload.refdir}")
+    if payload.mode not in ("vector", "lexical"):
+        raise HTTPException(status_code=400, detail="mode must be 'vector' or 'lexical'")
+    client = embedding_backend(payload.model_path)
+    refdir = os.path.abspath(payload.refdir)
+    if payload.mode == "lexical":
+        found = client.call("search", refdir=refdir, k=payload.k, query=payload.query)
+    else:
+        query_vectors = client.call("embed", texts=[payload.query], kind="query")["vectors"]
+        found = client.call("search", refdir=refdir, k=payload.k, vector=query_vectors)
+    score = "bm25" if payload.mode == "lexical" else "distance"  # BM25: higher is better; distance: lower
+    return {
+        "query": payload.query,
+        "mode": payload.mode,
+        "daemon": isinstance(client, DaemonClient),
+        "results": [{"id": doc_id, score: value, **doc}
+                    for doc_id, value, doc in zip(found["ids"], found["scores"], found["documents"])],
+    }
+
+@app.get("/embeddings/daemon")
+def embedding_daemon_stats(model_path: Optional[str] = None):
+    """Model, loaded reference indexes and request counters of the embedding backend."""
+    client = embedding_backend(model_path)
+    return {"daemon": isinstance(client, DaemonClient), **client.call("stats")}
+
 @app.post("/rag")
 async def rag_handler(payload: RAGRequest):
     # Simulate RAG processing based on user message
@@ -0,0 +1,173 @@
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from backend.coldrag.daemon.protocol import send_message, recv_message, encode_vectors, decode_vectors, decode_documents
+
+load_dotenv()
+
+EMBED_DAEMON = os.getenv("EMBED_DAEMON", "auto").lower()  # Options: 'auto' (use it if running), 'off'
+EMBED_DAEMON_SOCKET = os.getenv("EMBED_DAEMON_SOCKET", "output/run/coldrag.sock")
+EMBED_DAEMON_TIMEOUT = float(os.getenv("EMBED_DAEMON_TIMEOUT", 600))  # seconds; a cold reference sync can be slow
+
+
+class DaemonClient:
+    """One persistent connection to the embedding daemon; requests on it are serialized."""
+
+    def __init__(self, socket_path: str = EMBED_DAEMON_SOCKET, timeout: float = EMBED_DAEMON_TIMEOUT):
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sock: Optional[socket.socket] = None
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _exchange(self, request: dict) -> Optional[dict]:
+        if self.sock is None:
+            self.sock = self._connect()
+        send_message(self.sock, request)
+        return recv_message(self.sock)
+
+    def call(self, op: str, **fields) -> dict:
+        request = {"op": op, **fields}
+        with self.lock:
+            try:
+                response = self._exchange(request)
+            except (BrokenPipeError, ConnectionResetError):
+                response = None
+            if response is None:  # daemon restarted since the last request: reconnect once
+                self.close()
+                response = self._exchange(request)
+            if response is None:
+                raise RuntimeError(f"Embedding daemon closed the connection ({self.socket_path})")
+        if not response.get("ok"):
+            raise RuntimeError(f"Embedding daemon error: {response.get('error')}")
+        return response
+
+    def ping(self) -> dict:
+        return self.call("ping")
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class LocalClient:
+    """Same call() interface over an in-process RetrievalService (no daemon running)."""
+
+    def __init__(self, service):
+        self.service = service
+
+    def call(self, op: str, **fields) -> dict:
+        response = self.service.handle({"op": op, **fields})
+        if not response.get("ok"):
+            raise RuntimeError(f"Retrieval service error: {response.get('error')}")
+        return response
+
+
+_clients: Dict[str, DaemonClient] = {}
+_model_ids: Dict[str, str] = {}
+
+
+def expected_model_id(model_path: str) -> str:
+    """Fingerprint of the model that would embed model_path here (computed once per process)."""
+    if model_path not in _model_ids:
+        from backend.coldrag.train.embedding_setup import embedding_model_id
+        _model_ids[model_path] = embedding_model_id(model_path)
+    return _model_ids[model_path]
+
+
+def daemon_client(model_path: str, socket_path: str = EMBED_DAEMON_SOCKET) -> Optional[DaemonClient]:
+    """
+    Client of the running daemon if it embeds with the same model as model_path would here —
+    compared by fingerprint, so a retrained model or a different ONNX / fp32 backend is not
+    mistaken for the one served. None means embed in-process.
+    """
+    if EMBED_DAEMON == "off" or not os.path.exists(socket_path):
+        return None
+    client = _clients.get(socket_path)
+    try:
+        if client is None:
+            client = DaemonClient(socket_path)
+        served = client.ping()
+    except (OSError, RuntimeError) as e:
+        print(f"⚠️ Embedding daemon not reachable on {socket_path} ({type(e).__name__}) — embedding in-process")
+        return None
+    if served.get("model_id") != expected_model_id(str(model_path)):
+        print(f"⚠️ Embedding daemon serves {served['model']} ({str(served.get('model_id'))[:12]}), "
+              f"not the model at {model_path} — embedding in-process")
+        return None
+    if socket_path not in _clients:
+        print(f"🛰️ Using embedding daemon on {socket_path}")
+    _clients[socket_path] = client
+    return client
+
+
+_local_services: Dict[str, LocalClient] = {}
+
+
+def retrieval_client(model_path: str):
+    """The daemon if it is running, else a process-wide in-process service (kept warm between calls)."""
+    client = daemon_client(model_path)
+    if client is not None:
+        return client
+    if model_path not in _local_services:
+        from backend.coldrag.daemon.service import RetrievalService
+        _local_services[model_path] = LocalClient(RetrievalService(model_path))
+    return _local_services[model_path]
+
+
+class DaemonEmbeddings(Embeddings):
+    """LangChain embeddings computed by the daemon (which also applies the embedding cache)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        if not texts:
+            return []
+        return decode_vectors(self.client.call("embed", texts=list(texts), kind=kind)["vectors"]).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "doc")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+
+class RemoteTier:
+    """Reference tier searched by the daemon; same interface as tiered_retriever.LocalTier."""
+
+    def __init__(self, name: str, client, refdir: str, weight: float = 1.0, lexical: bool = False):
+        self.name = name
+        self.client = client
+        self.refdir = str(Path(refdir).resolve())
+        self.weight = weight
+        self.lexical = lexical
+        # Checks the corpus once per retriever, syncing the daemon's index if files changed
+        self.vectors = client.call("sync", refdir=self.refdir, lexical=lexical)["vectors"]
+        print(f"⚡ Reference tier served by the embedding daemon ({self.vectors} vectors)")
+
+    def _hits(self, response: dict) -> list:
+        docs = decode_documents(response["documents"])
+        vectors = decode_vectors(response["vectors"]) if "vectors" in response else [None] * len(docs)
+        return list(zip(response["ids"], docs, response["scores"], vectors))
+
+    def vector_hits(self, query_vector: np.ndarray, k: int) -> list:
+        if not self.vectors:
+            return []
+        return self._hits(self.client.call("search", refdir=self.refdir, k=k, vector=encode_vectors(query_vector)))
+
+    def lexical_hits(self, query: str, k: int) -> list:
+        if not self.lexical or not self.vectors:
+            return []
+        return self._hits(self.client.call("search", refdir=self.refdir, k=k, query=query))
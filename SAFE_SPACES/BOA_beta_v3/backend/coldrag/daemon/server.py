@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Resident embedding daemon: keeps the embedding model and the reference index warm and
+serves embed / search requests over a Unix domain socket (length-prefixed JSON, see
+protocol.py). The RAG inspector and the FastAPI server connect to it when it is running
+and fall back to in-process embedding when it is not (daemon/client.py).
+"""
+
+import os
+import sys
+import signal
+import argparse
+import threading
+import socketserver
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+
+from backend.coldrag.daemon.protocol import send_message, recv_message
+from backend.coldrag.daemon.client import EMBED_DAEMON_SOCKET, DaemonClient
+from backend.coldrag.train.embedding_setup import EMBEDDING_MODEL
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service = self.server.service
+        while True:  # one connection serves many requests
+            try:
+                request = recv_message(self.request)
+            except (OSError, ValueError):
+                return
+            if request is None:
+                return
+            if request.get("op") == "shutdown":
+                send_message(self.request, {"ok": True})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            send_message(self.request, service.handle(request))
+
+
+class EmbeddingDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service):
+        self.service = service
+        self.socket_path = socket_path
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)  # owner only: the socket serves reference documents
+
+
+def claim_socket(socket_path: str) -> bool:
+    """False if a daemon already answers on socket_path; removes a stale socket file otherwise."""
+    if not os.path.exists(socket_path):
+        Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+        return True
+    try:
+        DaemonClient(socket_path, timeout=2).ping()
+        return False
+    except (OSError, RuntimeError):
+        os.unlink(socket_path)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve embeddings and reference search over a Unix socket")
+    parser.add_argument("--socket", default=EMBED_DAEMON_SOCKET)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--refdir", action="append", default=[], help="Reference directory to load at start-up")
+    args = parser.parse_args()
+
+    if not claim_socket(args.socket):
+        print(f"✅ Embedding daemon already running on {args.socket}")
+        return
+
+    from backend.coldrag.daemon.service import RetrievalService
+    service = RetrievalService(args.model)
+    service.warm()
+    for refdir in args.refdir:
+        if os.path.isdir(refdir):
+            service.reference(refdir, sync=True)
+        else:
+            print(f"⚠️ Reference directory not found — not preloaded: {refdir}")
+
+    server = EmbeddingDaemon(args.socket, service)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"🛰️ Embedding daemon (pid {os.getpid()}) serving {args.model} on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        service.close()
+        print("🛑 Embedding daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+from backend.coldrag.daemon.protocol import encode_vectors, decode_vectors, encode_documents
+from backend.coldrag.train.embedding_setup import EMBEDDING_MODEL, create_embeddings
+from backend.coldrag.train.embedding_cache import CachedEmbeddings
+from backend.coldrag.train.tiered_retriever import LocalTier
+from backend.coldrag.train.ann_index import index_kind
+from backend.coldrag.utils.reference_loader import list_reference_files
+
+
+class RetrievalService:
+    """
+    Embedding model and reference indexes kept warm across requests. Used by the daemon
+    (daemon/server.py) and, when no daemon is running, in-process by the FastAPI server.
+
+    Requests are dicts {"op": ..., ...} answered with {"ok": True, ...} — the same messages
+    the daemon exchanges over its socket. Model work (embedding, reference sync) runs on a
+    single worker thread: the model is not shared across threads and the embedding cache's
+    SQLite connection belongs to the thread that opened it. Searches only read the loaded
+    indexes and run on the caller's thread.
+    """
+
+    def __init__(self, model_path: str = EMBEDDING_MODEL):
+        self.model_path = str(model_path)
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self.embeddings, self.model_id = self._run(create_embeddings, self.model_path)
+        self.references: Dict[str, dict] = {}  # resolved refdir -> {"tier": LocalTier, "corpus": hash}
+        self.started = time.time()
+        self.requests = 0
+        self.requests_lock = threading.Lock()  # handle() runs on one thread per connection
+
+    def _run(self, fn, *args):
+        return self.worker.submit(fn, *args).result()
+
+    def warm(self) -> None:
+        """Load the model now instead of on the first request."""
+        self._run(self.embeddings.embed_query, "warm-up")
+
+    # --- Operations -----------------------------------------------------------
+
+    def embed(self, texts, kind: str = "doc") -> np.ndarray:
+        if kind == "query":
+            return np.asarray([self._run(self.embeddings.embed_query, text) for text in texts], dtype=np.float32)
+        return np.asarray(self._run(self.embeddings.embed_documents, list(texts)), dtype=np.float32)
+
+    def reference(self, refdir: str, lexical: bool = False, sync: bool = False) -> Optional[LocalTier]:
+        """
+        Reference tier for refdir, loaded once; with sync (or on first use) the corpus is
+        checked by its file listing and the index synced incrementally if anything changed.
+        """
+        key = str(Path(refdir).resolve())
+        entry = self.references.get(key)
+        if entry is None or sync:
+            entry = self._run(self._sync, key, entry)
+        tier = entry["tier"]
+        if lexical and tier is not None and tier.lexical is None:
+            tier.lexical = self._run(self._lexical, tier)
+        return tier
+
+    def _sync(self, refdir: str, entry: Optional[dict]) -> dict:
+        from backend.coldrag.train.reference_index import corpus_fingerprint, sync_reference_index
+        corpus = corpus_fingerprint({str(file.resolve()): file for file in list_reference_files(refdir)})
+        if entry is not None and entry["corpus"] == corpus:
+            return entry
+        store = sync_reference_index(refdir, self.embeddings, model_id=self.model_id)
+        entry = {"tier": LocalTier("reference", store) if store is not None else None, "corpus": corpus}
+        self.references[refdir] = entry
+        return entry
+
+    @staticmethod
+    def _lexical(tier: LocalTier):
+        from backend.coldrag.train.reference_index import reference_lexical_index
+        return reference_lexical_index(tier.store)
+
+    def search(self, refdir: str, k: int, vector=None, query: Optional[str] = None) -> dict:
+        """Vector hits for vector (with the stored vectors, for MMR) or BM25 hits for query."""
+        tier = self.reference(refdir, lexical=query is not None)
+        if tier is None:
+            return {"ids": [], "scores": [], "documents": []}
+        if query is not None:
+            hits = tier.lexical_hits(query, k)
+        else:
+            hits = tier.vector_hits(np.asarray(vector, dtype=np.float32).reshape(-1), k)
+        result = {"ids": [h[0] for h in hits], "scores": [h[2] for h in hits],
+                  "documents": encode_documents([h[1] for h in hits])}
+        if query is None and hits:
+            result["vectors"] = encode_vectors(np.stack([h[3] for h in hits]))
+        return result
+
+    def stats(self) -> dict:
+        stats = {"model": self.model_path, "model_id": self.model_id, "pid": os.getpid(),
+                 "uptime_s": round(time.time() - self.started, 1), "requests": self.requests,
+                 "model_loaded": getattr(getattr(self.embeddings, "inner", self.embeddings), "loaded", True),
+                 "references": {refdir: {"vectors": len(entry["tier"].store.index_to_docstore_id),
+                                         "index": index_kind(entry["tier"].store.index),
+                                         "lexical": entry["tier"].lexical is not None}
+                                for refdir, entry in self.references.items() if entry["tier"] is not None}}
+        if isinstance(self.embeddings, CachedEmbeddings):
+            stats["cache"] = self._run(self.embeddings.cache.stats)
+        return stats
+
+    # --- Messages ---------------------------------------------------------------
+
+    def handle(self, request: dict) -> dict:
+        with self.requests_lock:
+            self.requests += 1
+        op = request.get("op")
+        try:
+            if op == "ping":
+                return {"ok": True, "model": self.model_path, "model_id": self.model_id, "pid": os.getpid()}
+            if op == "embed":
+                return {"ok": True, "vectors": encode_vectors(self.embed(request["texts"], request.get("kind", "doc")))}
+            if op == "sync":
+                tier = self.reference(request["refdir"], lexical=request.get("lexical", False), sync=True)
+                return {"ok": True, "vectors": len(tier.store.index_to_docstore_id) if tier is not None else 0}
+            if op == "search":
+                vector = decode_vectors(request["vector"]) if "vector" in request else None
+                return {"ok": True, **self.search(request["refdir"], int(request.get("k", 10)), vector,
+                                                  request.get("query"))}
+            if op == "stats":
+                return {"ok": True, **self.stats()}
+            return {"ok": False, "error": f"Unknown op: {op}"}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def close(self) -> None:
+        if isinstance(self.embeddings, CachedEmbeddings):
+            self._run(self.embeddings.cache.close)  # writes the buffered cache counters
+        self.worker.shutdown(wait=True)
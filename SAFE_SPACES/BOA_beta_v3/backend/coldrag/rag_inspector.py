@@ -9,24 +9,36 @@ from dotenv import load_dotenv
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(ROOT_DIR))
 
-from backend.coldrag.utils.plan_parser import load_terraform_docs
+from backend.coldrag.utils.plan_model import TerraformPlan
+from backend.coldrag.utils.resource_record import records_to_documents
+from backend.coldrag.utils.resource_renderer import COMPACT_RENDERING, report_token_savings
 from backend.coldrag.utils.reference_loader import load_reference_docs
 from backend.coldrag.train.embedding_setup import load_embeddings_and_retriever
+from backend.coldrag.train.reference_index import REF_INDEX
 from backend.coldrag.utils.llm_runner import init_llm, run_rag_chain
 from backend.coldrag.utils.prompt_loader import load_prompt_template
-from backend.coldrag.utils.output_validator import validate_and_write_output
+from backend.coldrag.utils.output_validator import (
+    validate_and_write_output, merge_violations_into_output, load_compliance_output
+)
+from backend.coldrag.utils.plan_delta import diff_records, carry_forward_violations
+from backend.coldrag.utils.fingerprints import FingerprintLedger, split_unchanged, prompted_resources, record_results
 from backend.coldrag.utils.inspector_utils import log_loaded_docs, log_llm_sources
 
 # --- Load environment variables ---
 load_dotenv()
 MODEL_PATH = os.getenv("EMBEDDING_MODEL")
 PROMPT_FILE = os.getenv("DEFAULT_PROMPT_FILE", "blanket_compliance_prompt.txt")
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "false").lower() == "true"
 
 # --- CLI Setup ---
 parser = argparse.ArgumentParser(description="RAG compliance analyzer for Terraform plans")
 parser.add_argument("plan_json", help="Path to Terraform plan JSON")
 parser.add_argument("output_path", help="Path to save compliance JSON")
 parser.add_argument("--refdir", help="Optional directory of static compliance references")
+parser.add_argument("--skip-unchanged", action="store_true", default=SKIP_UNCHANGED,
+                    help="Reuse ledger results for resources whose fingerprint was already analyzed")
+parser.add_argument("--delta-from", help="Previous plan JSON; only added/changed resources are analyzed and "
+                                         "merged with the existing findings at output_path")
 args = parser.parse_args()
 
 ##############################################
@@ -44,18 +56,56 @@ if importlib.util.find_spec("pypdf") is None:
 
 # --- Step 1: Load Terraform plan or state JSON ---
 print("📄 Parsing Terraform input file...")
-docs = load_terraform_docs(args.plan_json)
+# Decoded once; the pickled model is reused by the HTML and cost stages. Parsing streams
+# (PLAN_STREAMING); the model then holds every record, so filters below select from it.
+plan = TerraformPlan.load(args.plan_json)
+records = plan.records
+
+ledger = FingerprintLedger()
+reused_violations, reused_recommendations = [], []
+delta_labels = {}
+
+if args.delta_from:
+    # Both sides come from the cached plan models; neither JSON is re-parsed
+    delta = diff_records(TerraformPlan.load(args.delta_from).records, plan.records)
+    print(f"🔀 Plan delta vs {args.delta_from}: {delta.summary()}")
+    previous = load_compliance_output(args.output_path)
+    reused_violations += carry_forward_violations(previous["violations"], delta)
+    reused_recommendations = previous["recommendations"]
+    delta_labels = {**{a: "added" for a in delta.added}, **{a: "changed" for a in delta.changed}}
+    # Through the address index: O(delta), not a scan of every record; plan order kept
+    records = [plan.records[i] for i in sorted(plan.by_address[a] for a in delta_labels if a in plan.by_address)]
+
+if args.skip_unchanged:
+    records, cached_violations = split_unchanged(ledger, records)
+    reused_violations += cached_violations
+    print(f"♻️ {len(records)} new/changed resources to analyze ({len(cached_violations)} cached violations reused)")
+
+if not records and (args.delta_from or args.skip_unchanged):
+    merge_violations_into_output(args.output_path, reused_violations, reused_recommendations, reset_violations=True)
+    print("✅ No changed resources — reused previous analysis.")
+    sys.exit(0)
 
 # --- Step 2: Load static reference files (if given) ---
-if args.refdir:
+# With REF_INDEX the persisted reference index is synced in Step 3 instead
+ref_docs = []
+if args.refdir and not REF_INDEX:
     print(f"📚 Loading reference materials from: {args.refdir}")
     ref_docs = load_reference_docs(args.refdir)
-    docs.extend(ref_docs)
 
+# --- Step 3: Create vector index using embeddings ---
+# Resources stay as compact records until this point
+plan_docs = records_to_documents(records)
+if COMPACT_RENDERING:
+    report_token_savings(record.resource for record in records)
+for record, doc in zip(records, plan_docs):
+    if record.address in delta_labels:
+        doc.metadata["delta"] = delta_labels[record.address]
+docs = plan_docs + ref_docs
 log_loaded_docs(docs)
 
-# --- Step 3: Create vector index using embeddings ---
-retriever = load_embeddings_and_retriever(docs, model_path=MODEL_PATH)
+retriever = load_embeddings_and_retriever(docs, model_path=MODEL_PATH,
+                                          reference_dir=args.refdir if REF_INDEX else None)
 
 # --- Step 4: Load the LLM and Prompt ---
 llm = init_llm()
@@ -68,8 +118,22 @@ response = run_rag_chain(llm, retriever, prompt_template)
 log_llm_sources(response)
 
 # --- Step 6: Validate and Save Output ---
-validate_and_write_output(response, args.plan_json, args.output_path)
-
+parsed = validate_and_write_output(response, args.plan_json, args.output_path)
+
+# Only remember results that actually parsed; a fallback run must be retried next time
+if parsed is not None:
+    violations = parsed if isinstance(parsed, list) else parsed.get("violations", [])
+    # Resources outside the retrieved context were not analyzed; they stay fresh for next time
+    stored = record_results(ledger, records, violations, prompted_resources(response.get("source_documents", [])))
+    ledger.save()
+    print(f"🧾 Ledger: {stored} of {len(records)} analyzed resources reached the prompt and were recorded")
+if reused_violations or reused_recommendations:
+    merge_violations_into_output(args.output_path, reused_violations, reused_recommendations)
+
+if parsed is None:
+    # Not a result: the fallback must not become the baseline a later delta run builds on
+    print("❌ RAG Inspector output could not be parsed — exiting with status 1 (fallback output written).")
+    sys.exit(1)
 print("✅ RAG Inspector analysis complete.")
 
 # coldrag/scripts/rag_inspector.py
@@ -0,0 +1,396 @@
+import os
+import json
+import math
+import time
+import pickle
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+
+load_dotenv()
+
+ANN_INDEX = os.getenv("ANN_INDEX", "auto").lower()  # Options: 'auto', 'flat', 'hnsw', 'ivfpq'
+ANN_MEMORY_MB = int(os.getenv("ANN_MEMORY_MB", 2048))  # RAM budget for the search index
+ANN_FLAT_MAX = int(os.getenv("ANN_FLAT_MAX", 50000))  # exact search up to this many vectors
+ANN_HNSW_M = int(os.getenv("ANN_HNSW_M", 32))
+ANN_EF_CONSTRUCTION = int(os.getenv("ANN_EF_CONSTRUCTION", 200))
+ANN_EF_SEARCH = int(os.getenv("ANN_EF_SEARCH", 128))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", 32))
+ANN_PCA_DIM = int(os.getenv("ANN_PCA_DIM", 0))  # PCA-project to this many dimensions before HNSW / IVF-PQ (0 = off)
+ANN_RERANK = int(os.getenv("ANN_RERANK", 4))  # re-score k × ANN_RERANK compressed candidates at full precision (0 = off)
+ANN_REBUILD_DELETED = float(os.getenv("ANN_REBUILD_DELETED", 0.2))  # rebuild once this share of indexed rows is deleted
+
+# IVF-PQ: sub-quantizers tried from most to least precise; up to 8 bits each (256 centroids)
+PQ_SUBQUANTIZERS = [96, 64, 48, 32, 24, 16, 8]
+PQ_BITS = 8
+# faiss wants ≥39 training points per centroid; more than 256 per centroid adds little
+TRAIN_MIN_PER_LIST = 39
+TRAIN_MAX_PER_LIST = 256
+ADD_BATCH = 65536
+PCA_TRAIN_MAX = 100000
+RECALL_QUERIES = 100
+RECALL_K = 10
+RECALL_SAMPLE = 50000  # corpus rows the recall ground truth is computed over
+RECALL_MAX_DEPTH = 2048
+
+FLAT_FILE = "index.faiss"  # LangChain's flat index (stores up to ANN_FLAT_MAX vectors)
+ANN_FILE = "ann.faiss"
+ANN_SPEC_FILE = "ann_spec.json"
+VECTORS_FILE = "vectors.f32"  # full-precision rows of an ANN store, append-only, memory-mapped
+LIVE_FILE = "live.npy"  # rows not deleted, in docstore position order
+ANN_FILES = (ANN_FILE, ANN_SPEC_FILE, VECTORS_FILE, LIVE_FILE)
+
+
+def estimate_bytes(kind: str, n: int, dim: int, params: dict) -> int:
+    """
+    Approximate resident size of each index type (vectors + graph / codes + codebooks, plus
+    the PCA matrix when projecting). The re-ranking vectors are memory-mapped and not counted.
+    """
+    pca = params.get("pca_dim")
+    projection = dim * pca * 4 if pca else 0
+    dim = pca or dim
+    if kind == "hnsw":
+        return n * (4 * dim + 2 * 4 * params["m"] + 16) + projection
+    if kind == "ivfpq":
+        codebooks = (2 ** params["nbits"]) * dim * 4
+        return n * (params["pq_m"] * params["nbits"] // 8 + 8) + params["nlist"] * dim * 4 + codebooks + projection
+    return n * dim * 4
+
+
+def ivfpq_params(n: int, dim: int, budget: int) -> dict:
+    nlist = 2 ** round(math.log2(max(1.0, 4 * math.sqrt(n))))
+    nlist = max(1, min(nlist, 65536, n // TRAIN_MIN_PER_LIST or 1))
+    divisors = [m for m in PQ_SUBQUANTIZERS if dim % m == 0] or [1]
+    # Fewer bits per code on small sets, so every PQ centroid still gets enough training points
+    nbits = max(4, min(PQ_BITS, int(math.log2(max(n // TRAIN_MIN_PER_LIST, 1)))))
+    params = {"nlist": nlist, "pq_m": divisors[-1], "nbits": nbits, "nprobe": ANN_NPROBE}
+    for m in divisors:
+        if estimate_bytes("ivfpq", n, dim, {**params, "pq_m": m}) <= budget:
+            params["pq_m"] = m
+            break
+    return params
+
+
+def choose_index_spec(n: int, dim: int, kind: str = ANN_INDEX, memory_mb: int = ANN_MEMORY_MB,
+                      pca_dim: int = ANN_PCA_DIM) -> dict:
+    """
+    Pick the index for n vectors: exact flat while small, HNSW while its full-precision
+    vectors + graph fit the memory budget, IVF-PQ (compressed codes) beyond that.
+    With pca_dim, HNSW / IVF-PQ index vectors projected to that many dimensions.
+    """
+    budget = memory_mb * 1024 * 1024
+    pca = {"pca_dim": pca_dim} if 0 < pca_dim < dim else {}
+    hnsw = {"m": ANN_HNSW_M, "ef_construction": ANN_EF_CONSTRUCTION, "ef_search": ANN_EF_SEARCH, **pca}
+    if kind == "auto":
+        if n <= ANN_FLAT_MAX:
+            kind = "flat"
+        else:
+            kind = "hnsw" if estimate_bytes("hnsw", n, dim, hnsw) <= budget else "ivfpq"
+    if kind == "ivfpq":
+        projection = dim * pca["pca_dim"] * 4 if pca else 0
+        params = {**ivfpq_params(n, pca.get("pca_dim", dim), budget - projection), **pca}
+    else:
+        params = hnsw if kind == "hnsw" else {}
+    spec = {"kind": kind, "params": params, "vectors": n, "dim": dim,
+            "estimated_mb": round(estimate_bytes(kind, n, dim, params) / 1024 / 1024, 1)}
+    if is_lossy(spec):
+        spec["rerank_mb"] = round(n * dim * 4 / 1024 / 1024, 1)  # on disk, paged in per candidate
+    return spec
+
+
+def is_lossy(spec: dict) -> bool:
+    """Compressed (PQ codes and / or PCA projection): distances are approximate, so re-rank."""
+    return spec["kind"] == "ivfpq" or bool(spec["params"].get("pca_dim"))
+
+
+def configure_search(index, spec: dict) -> None:
+    """Query-time knobs are not all persisted by faiss.write_index; reapply them after loading."""
+    import faiss
+    if spec["kind"] == "hnsw":
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+        inner.hnsw.efSearch = spec["params"]["ef_search"]
+    elif spec["kind"] == "ivfpq":
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = spec["params"]["nprobe"]
+        ivf.make_direct_map()  # reconstruct() by id, needed for MMR re-ranking
+
+
+
+def build_ann_index(vectors: np.ndarray, spec: dict, seed: int = 1234):
+    """
+    Build the index described by spec. IDs stay 0..n-1 in input order. vectors may be a
+    memory map: only the training sample and one ADD_BATCH slice at a time are read into RAM.
+    With params["pca_dim"], a PCA projection fitted on the corpus is stored in front of the index.
+    """
+    import faiss
+    n, dim = vectors.shape
+    params = spec["params"]
+    reduced = params.get("pca_dim") or dim
+    sample = min(n, PCA_TRAIN_MAX) if reduced < dim else 0
+    if spec["kind"] == "hnsw":
+        index = faiss.IndexHNSWFlat(reduced, params["m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    elif spec["kind"] == "ivfpq":
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(reduced), reduced, params["nlist"], params["pq_m"], params["nbits"])
+        sample = max(sample, min(n, TRAIN_MAX_PER_LIST * params["nlist"]))
+    else:
+        index = faiss.IndexFlatL2(dim)
+    if reduced < dim:
+        index = faiss.IndexPreTransform(faiss.PCAMatrix(dim, reduced), index)
+    if sample:
+        rows = np.sort(np.random.default_rng(seed).choice(n, size=sample, replace=False))
+        index.train(np.ascontiguousarray(vectors[rows], dtype=np.float32))
+        spec["trained_on"] = int(sample)
+    for start in range(0, n, ADD_BATCH):
+        index.add(np.ascontiguousarray(vectors[start:start + ADD_BATCH], dtype=np.float32))
+    configure_search(index, spec)
+    return index
+
+
+class AnnIndex:
+    """
+    Search index of a large store: an HNSW / IVF-PQ index over the rows of an append-only
+    float32 file (vectors.f32, memory-mapped), and the rows still live. Exposes the part of
+    the faiss index API the FAISS store and the tiers use, position i being the i-th live row
+    (the docstore mapping): add() appends rows and adds them to the ANN index in place,
+    remove_ids() only drops rows from live — they are filtered out of results until the
+    next rebuild (fit_store). Compressed indexes re-score k × rerank candidates with the
+    full-precision rows, so distances are exact squared L2 like IndexFlatL2's; reconstruct()
+    returns the original vectors. Only the candidates' pages of the file are loaded.
+    """
+
+    def __init__(self, index, spec: dict, vectors_path, live: Optional[np.ndarray] = None,
+                 rerank: int = ANN_RERANK):
+        self.index = index
+        self.spec = spec
+        self.vectors_path = Path(vectors_path)
+        self.rows = index.ntotal
+        self.live = np.arange(self.rows, dtype=np.int64) if live is None else np.asarray(live, dtype=np.int64)
+        self.d = spec["dim"]
+        self.rerank = rerank if is_lossy(spec) else 0
+        self._vectors = None
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.live)
+
+    @property
+    def deleted(self) -> float:
+        """Share of indexed rows that were removed since the last build."""
+        return 1 - self.ntotal / self.rows if self.rows else 0.0
+
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.d)) \
+                if self.rows else np.empty((0, self.d), dtype=np.float32)
+        return self._vectors
+
+    def add(self, x: np.ndarray) -> None:
+        x = np.ascontiguousarray(x, dtype=np.float32).reshape(-1, self.d)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(self.rows * self.d * 4)  # rows past ntotal are left over from an unsaved sync
+            f.write(x.tobytes())
+        for start in range(0, len(x), ADD_BATCH):
+            self.index.add(x[start:start + ADD_BATCH])
+        self.live = np.concatenate([self.live, np.arange(self.rows, self.rows + len(x), dtype=np.int64)])
+        self.rows += len(x)
+        self._vectors = None
+
+    def remove_ids(self, positions: np.ndarray) -> int:
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        self.live = np.delete(self.live, positions)
+        return len(positions)
+
+    def search(self, queries: np.ndarray, k: int):
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.d)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        labels = np.full((len(queries), k), -1, dtype=np.int64)
+        if not self.ntotal or k <= 0:
+            return distances, labels
+        # Deeper by the deleted share, so enough live rows remain after filtering
+        fetch = min(math.ceil(k * max(self.rerank, 1) * self.rows / self.ntotal), self.rows)
+        found_distances, found_rows = self.index.search(queries, fetch)
+        for i, (query, scores, rows) in enumerate(zip(queries, found_distances, found_rows)):
+            positions = np.minimum(np.searchsorted(self.live, rows), self.ntotal - 1)
+            alive = (rows >= 0) & (self.live[positions] == rows)
+            scores, rows, positions = scores[alive], rows[alive], positions[alive]
+            if self.rerank:
+                order = np.argsort(rows)  # ascending rows: sequential reads from the memory map
+                rows, positions = rows[order], positions[order]
+                scores = ((np.asarray(self.vectors()[rows]) - query) ** 2).sum(axis=1)
+            best = np.argsort(scores, kind="stable")[:k]
+            distances[i, :len(best)] = scores[best]
+            labels[i, :len(best)] = positions[best]
+        return distances, labels
+
+    def reconstruct(self, i: int) -> np.ndarray:
+        return np.array(self.vectors()[self.live[i]], dtype=np.float32)
+
+    def reconstruct_n(self, i0: int, n: int) -> np.ndarray:
+        return np.array(self.vectors()[self.live[i0:i0 + n]], dtype=np.float32)
+
+    def save(self, index_dir: str) -> None:
+        import faiss
+        target = Path(index_dir) / VECTORS_FILE
+        if self.vectors_path != target:  # rebuilt into a new file
+            os.replace(self.vectors_path, target)
+            self.vectors_path, self._vectors = target, None
+        tmp = Path(index_dir) / (ANN_FILE + ".tmp")
+        faiss.write_index(self.index, str(tmp))
+        os.replace(tmp, Path(index_dir) / ANN_FILE)
+        tmp = Path(index_dir) / "live.tmp.npy"
+        np.save(tmp, self.live)
+        os.replace(tmp, Path(index_dir) / LIVE_FILE)
+
+
+def index_kind(index) -> str:
+    return index.spec["kind"].upper() if isinstance(index, AnnIndex) else type(index).__name__
+
+
+def measure_recall(index, vectors: np.ndarray, rerank: int = 0, k: int = RECALL_K, queries: int = RECALL_QUERIES,
+                   sample: int = RECALL_SAMPLE, seed: int = 99) -> dict:
+    """
+    Estimated recall@k of a freshly built index (IDs = rows of vectors) against exact search,
+    at a cost that does not grow with the corpus: the ground truth is exact search within a
+    random sample of the rows (queries drawn from it), and the index is searched deep enough
+    (k × n / sample) that the sample's true neighbours would make its top-k; its results are
+    then restricted to the sample and, with rerank, re-scored like AnnIndex.search does.
+    Past RECALL_MAX_DEPTH the measured k shrinks instead of the search growing deeper.
+    """
+    import faiss
+    n = len(vectors)
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(n, size=min(sample, n), replace=False))
+    subset = np.ascontiguousarray(vectors[rows], dtype=np.float32)
+    picked = subset[rng.choice(len(rows), size=min(queries, len(rows)), replace=False)]
+    k = max(1, min(k, len(rows), RECALL_MAX_DEPTH * len(rows) // n))
+    depth = min(math.ceil(k * n / len(rows)) * max(rerank, 1), index.ntotal)
+    truth = faiss.knn(picked, subset, k)[1]
+    found_distances, found_rows = index.search(picked, depth)
+    recalls = []
+    for query, scores, found, expected in zip(picked, found_distances, found_rows, truth):
+        positions = np.minimum(np.searchsorted(rows, found), len(rows) - 1)
+        in_sample = (found >= 0) & (rows[positions] == found)
+        scores, positions = scores[in_sample], positions[in_sample]
+        if rerank:
+            scores = ((subset[positions] - query) ** 2).sum(axis=1)
+        top = positions[np.argsort(scores, kind="stable")[:k]]
+        recalls.append(len(set(top) & set(expected)) / k)
+    return {"k": int(k), "recall": round(float(np.mean(recalls)), 3), "sample": int(len(rows))}
+
+
+def with_index(vectorstore: FAISS, index) -> FAISS:
+    """Same documents and ID mapping, different search index."""
+    return FAISS(vectorstore.embedding_function, index, vectorstore.docstore, vectorstore.index_to_docstore_id)
+
+
+def _read_spec(index_dir: str) -> Optional[dict]:
+    path = Path(index_dir) / ANN_SPEC_FILE
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def _spec_matches(built: dict, wanted: dict) -> bool:
+    return {k: built.get(k) for k in ("kind", "params", "dim")} == {k: wanted[k] for k in ("kind", "params", "dim")}
+
+
+def load_store(index_dir: str, embeddings) -> Optional[FAISS]:
+    """
+    The persisted store: flat (LangChain's index.faiss) or ANN (ann.faiss over the memory-mapped
+    vectors.f32, see AnnIndex). The full-precision vectors of an ANN store are not read into RAM.
+    None when there is no store, or when its files do not belong to the same save.
+    """
+    spec = _read_spec(index_dir)
+    if spec is None:
+        if not (Path(index_dir) / FLAT_FILE).exists():
+            return None
+        return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    paths = [Path(index_dir) / name for name in (*ANN_FILES, "index.pkl")]
+    if not all(path.exists() for path in paths):
+        return None
+    import faiss
+    index = faiss.read_index(str(Path(index_dir) / ANN_FILE))
+    configure_search(index, spec)
+    live = np.load(Path(index_dir) / LIVE_FILE)
+    with open(Path(index_dir) / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    vectors_path = Path(index_dir) / VECTORS_FILE
+    if index.ntotal != spec["rows"] or len(live) != spec["live"] or len(index_to_docstore_id) != len(live) \
+            or vectors_path.stat().st_size < spec["rows"] * spec["dim"] * 4:
+        print(f"⚠️ ANN index files in {index_dir} are from different saves — ignoring them")
+        return None
+    return FAISS(embeddings, AnnIndex(index, spec, vectors_path, live), docstore, index_to_docstore_id)
+
+
+def fit_store(vectorstore: FAISS, index_dir: str) -> FAISS:
+    """
+    Keep the store's index suited to its size. Added vectors go into the current index in
+    place (AnnIndex.add), so this only rebuilds when the choice changes — flat ⇄ HNSW / IVF-PQ
+    at ANN_FLAT_MAX or the memory budget, IVF-PQ lists / codes as the corpus grows, settings —
+    or when more than ANN_REBUILD_DELETED of the indexed rows were deleted. Rebuilds stream the
+    live vectors batch by batch into a new vectors file (written to index_dir, put in place by
+    save_store) and build from its memory map; the recall printed is a sampled estimate.
+    Besides the index, a rebuild holds one ADD_BATCH slice, the training sample and the
+    recall sample in RAM, never the full float32 matrix — except when a flat store (in RAM
+    by nature) first grows past ANN_FLAT_MAX and is converted. Returns vectorstore itself
+    when nothing changed.
+    """
+    import faiss
+    index = vectorstore.index
+    spec = choose_index_spec(index.ntotal, index.d)
+    if isinstance(index, AnnIndex):
+        if spec["kind"] != "flat" and _spec_matches(index.spec, spec) and index.deleted <= ANN_REBUILD_DELETED:
+            return vectorstore
+    elif spec["kind"] == "flat":
+        return vectorstore
+
+    start = time.perf_counter()
+    n, dim = index.ntotal, index.d
+    if spec["kind"] == "flat":
+        flat = faiss.IndexFlatL2(dim)
+        for begin in range(0, n, ADD_BATCH):
+            flat.add(index.reconstruct_n(begin, min(ADD_BATCH, n - begin)))
+        print(f"🧭 Switched to exact FLAT search over {n} vectors")
+        return with_index(vectorstore, flat)
+
+    path = Path(index_dir) / (VECTORS_FILE + ".tmp")
+    with open(path, "wb") as f:
+        for begin in range(0, n, ADD_BATCH):
+            f.write(np.ascontiguousarray(index.reconstruct_n(begin, min(ADD_BATCH, n - begin))).tobytes())
+    vectors = np.memmap(path, dtype=np.float32, mode="r", shape=(n, dim))
+    built = build_ann_index(vectors, spec)
+    spec["build_seconds"] = round(time.perf_counter() - start, 2)
+    ann = AnnIndex(built, spec, path)
+    # Recall of what queries actually search: compressed codes, re-ranked if enabled
+    spec["recall"] = measure_recall(built, vectors, ann.rerank)
+    del vectors
+    compression = f", PCA {spec['dim']}→{spec['params']['pca_dim']}" if spec["params"].get("pca_dim") else ""
+    rerank = f", re-ranking ×{ann.rerank} from {VECTORS_FILE}" if ann.rerank else ""
+    reason = f"{index.deleted:.0%} deleted" if isinstance(index, AnnIndex) and _spec_matches(index.spec, spec) else "new index"
+    print(f"🧭 Built {spec['kind'].upper()} index over {n} vectors in {spec['build_seconds']}s ({reason}; "
+          f"~{spec['estimated_mb']} MB{compression}{rerank}, "
+          f"recall@{spec['recall']['k']} ≈ {spec['recall']['recall']:.3f} on a {spec['recall']['sample']}-vector sample, "
+          f"params {spec['params']})")
+    return with_index(vectorstore, ann)
+
+
+def save_store(vectorstore: FAISS, index_dir: str) -> None:
+    """Persist the store in its index' format, removing the other format's files."""
+    directory = Path(index_dir)
+    if not isinstance(vectorstore.index, AnnIndex):
+        vectorstore.save_local(index_dir)
+        for name in (*ANN_FILES, VECTORS_FILE + ".tmp"):
+            (directory / name).unlink(missing_ok=True)
+        return
+    index = vectorstore.index
+    index.save(index_dir)
+    tmp = directory / "index.pkl.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump((vectorstore.docstore, vectorstore.index_to_docstore_id), f)
+    os.replace(tmp, directory / "index.pkl")
+    (directory / FLAT_FILE).unlink(missing_ok=True)
+    # Written last: load_store only accepts files matching the spec's row counts
+    tmp = directory / (ANN_SPEC_FILE + ".tmp")
+    tmp.write_text(json.dumps({**index.spec, "rows": index.rows, "live": index.ntotal}, indent=2))
+    os.replace(tmp, directory / ANN_SPEC_FILE)
@@ -0,0 +1,209 @@
+import os
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+load_dotenv()
+
+CHUNKER = os.getenv("CHUNKER", "tokens").lower()  # Options: 'tokens', 'chars' (CHUNK_SIZE characters)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 0))  # 0 = the embedding model's max_seq_length
+CHUNK_TOKEN_OVERLAP = int(os.getenv("CHUNK_TOKEN_OVERLAP", 32))
+JSON_CHUNKING = os.getenv("JSON_CHUNKING", "true").lower() == "true"
+
+# [CLS] and [SEP] count against max_seq_length but are not part of the chunk text
+SPECIAL_TOKENS = 2
+DEFAULT_MAX_SEQ_LENGTH = 384
+
+
+def model_max_length(model_path: str) -> int:
+    config = Path(model_path) / "sentence_bert_config.json"
+    if config.exists():
+        return json.loads(config.read_text()).get("max_seq_length", DEFAULT_MAX_SEQ_LENGTH)
+    return DEFAULT_MAX_SEQ_LENGTH
+
+
+def chunker_settings(model_path: str, mode: str = CHUNKER) -> dict:
+    """What determines the chunks (part of the persisted reference index key) — no tokenizer load."""
+    if mode == "chars":
+        return {"mode": "chars", "size": CHUNK_SIZE, "overlap": CHUNK_OVERLAP, "json": JSON_CHUNKING}
+    max_tokens = model_max_length(model_path) - SPECIAL_TOKENS
+    budget = min(CHUNK_TOKENS or max_tokens, max_tokens)
+    return {"mode": "tokens", "size": budget, "overlap": min(CHUNK_TOKEN_OVERLAP, budget // 4), "json": JSON_CHUNKING}
+
+
+def looks_like_json(text: str) -> Optional[object]:
+    """Parsed value if text is a JSON object/array (plan resources, JSONLoader documents), else None."""
+    stripped = text.lstrip()
+    if not stripped or stripped[0] not in "{[":
+        return None
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        return None
+
+
+def compact(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+class Chunker:
+    """
+    Splits documents into chunks measured in the embedding model's own tokens, so a chunk
+    is never longer than what the model actually embeds. JSON documents are split at
+    object / array boundaries, each piece prefixed with its path ($.resources[3].values).
+    Keeps truncation and fill statistics for report().
+    """
+
+    def __init__(self, model_path: str, mode: str = CHUNKER):
+        self.mode = mode
+        self.tokenizer = self._load_tokenizer(model_path)
+        self.fast = getattr(self.tokenizer, "backend_tokenizer", None)
+        if self.fast is None and hasattr(self.tokenizer, "no_truncation"):
+            self.fast = self.tokenizer  # loaded from tokenizer.json directly
+        if self.fast is not None:
+            self.fast.no_truncation()
+        self.max_tokens = model_max_length(model_path) - SPECIAL_TOKENS
+        self.budget = min(CHUNK_TOKENS or self.max_tokens, self.max_tokens)
+        if mode != "tokens" or self.tokenizer is None:
+            self.mode = "chars"
+        self.overlap = min(CHUNK_TOKEN_OVERLAP, self.budget // 4) if self.mode == "tokens" else CHUNK_OVERLAP
+        self.splitter = self.text_splitter(self.limit())
+        self.reset()
+
+    def text_splitter(self, size: int) -> RecursiveCharacterTextSplitter:
+        overlap = min(self.overlap, size // 4)
+        length = self.count if self.mode == "tokens" else len
+        return RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap, length_function=length)
+
+    @staticmethod
+    def _load_tokenizer(model_path: str):
+        tokenizer_file = Path(model_path) / "tokenizer.json"
+        try:
+            if tokenizer_file.exists():  # Rust tokenizer only: no transformers import in daemon clients
+                from tokenizers import Tokenizer
+                return Tokenizer.from_file(str(tokenizer_file))
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            tokenizer.model_max_length = 10 ** 9  # only measures; silence the over-length warnings
+            return tokenizer
+        except Exception as e:
+            print(f"⚠️ Could not load tokenizer from {model_path} ({type(e).__name__}) — chunking by characters")
+            return None
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is None:
+            return len(text) // 4
+        if self.fast is not None:  # the Rust tokenizer directly: the splitter calls this per fragment
+            return len(self.fast.encode(text, add_special_tokens=False).ids)
+        return len(self.tokenizer.encode(text, add_special_tokens=False, truncation=False, verbose=False))
+
+    # --- JSON -------------------------------------------------------------
+
+    def size(self, text: str) -> int:
+        return len(text) if self.mode == "chars" else self.count(text)
+
+    def limit(self) -> int:
+        return CHUNK_SIZE if self.mode == "chars" else self.budget
+
+    def _emit(self, text: str) -> Iterator[str]:
+        """Grouping sizes are summed per member, so verify the joined piece before emitting it."""
+        if self.size(text) <= self.limit():
+            yield text
+        else:
+            yield from self.splitter.split_text(text)
+
+    def split_json(self, value, path: str = "$") -> Iterator[str]:
+        """
+        Whole value if it fits; otherwise consecutive keys / elements grouped greedily into
+        pieces that fit, recursing into any single member too large on its own.
+        """
+        prefix = "" if path == "$" else f"{path}: "
+        text = prefix + compact(value)
+        if self.size(text) <= self.limit():
+            yield text
+            return
+        if isinstance(value, dict):
+            members = [(f"{path}.{key}", {key: item}, item) for key, item in value.items()]
+            join = lambda group: compact({k: v for _, single, _ in group for k, v in single.items()})
+        elif isinstance(value, list):
+            members = [(f"{path}[{i}]", [item], item) for i, item in enumerate(value)]
+            join = lambda group: compact([item for _, _, item in group])
+        else:  # long scalar: plain text splitting, leaving room for the path prefix
+            splitter = self.text_splitter(max(self.limit() - self.size(prefix), self.limit() // 2))
+            yield from (prefix + piece for piece in splitter.split_text(str(value)))
+            return
+
+        # Brackets + prefix once per piece; each member costs its own size (minus brackets) + a comma
+        overhead = self.size(prefix) + 2
+        group, used = [], overhead
+        for member in members:
+            cost = self.size(compact(member[1])) - 1
+            if overhead + cost > self.limit():
+                if group:
+                    yield from self._emit(prefix + join(group))
+                    group, used = [], overhead
+                yield from self.split_json(member[2], member[0])
+                continue
+            if used + cost > self.limit():
+                yield from self._emit(prefix + join(group))
+                group, used = [], overhead
+            group.append(member)
+            used += cost
+        if group:
+            yield from self._emit(prefix + join(group))
+
+    # --- Documents ----------------------------------------------------------
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        chunks = []
+        for doc in documents:
+            value = looks_like_json(doc.page_content) if JSON_CHUNKING else None
+            if value is not None and isinstance(value, (dict, list)):
+                pieces = list(self.split_json(value))
+                chunks.extend(Document(page_content=piece, metadata=dict(doc.metadata)) for piece in pieces)
+            else:
+                chunks.extend(self.splitter.split_documents([doc]))
+        self.measure(chunks)
+        return chunks
+
+    def measure(self, chunks: List[Document]) -> None:
+        if self.tokenizer is None:
+            return
+        for chunk in chunks:
+            tokens = self.count(chunk.page_content)
+            self.stats["chunks"] += 1
+            self.stats["tokens"] += tokens
+            if tokens > self.max_tokens:
+                self.stats["truncated"] += 1
+                self.stats["lost_tokens"] += tokens - self.max_tokens
+
+    def reset(self) -> None:
+        self.stats = {"chunks": 0, "tokens": 0, "truncated": 0, "lost_tokens": 0}
+
+    def report(self, label: str = "chunks") -> dict:
+        """Truncation rate (chunks longer than max_seq_length) and fill; resets the counters."""
+        stats = dict(self.stats, mode=self.mode, max_tokens=self.max_tokens)
+        if stats["chunks"]:
+            stats["truncation_rate"] = round(stats["truncated"] / stats["chunks"], 4)
+            stats["fill"] = round(stats["tokens"] / stats["chunks"] / self.max_tokens, 4)
+            print(f"✂️ Chunking ({self.mode}): {stats['chunks']} {label}, "
+                  f"{stats['truncation_rate']:.1%} truncated at {self.max_tokens} tokens "
+                  f"({stats['lost_tokens']} tokens never embedded), average fill {stats['fill']:.0%}")
+        self.reset()
+        return stats
+
+
+_chunkers: Dict[Tuple[str, str], Chunker] = {}
+
+
+def get_chunker(model_path: str, mode: str = CHUNKER) -> Chunker:
+    """One chunker (and tokenizer) per model per process."""
+    key = (str(model_path), mode)
+    if key not in _chunkers:
+        _chunkers[key] = Chunker(model_path, mode)
+    return _chunkers[key]
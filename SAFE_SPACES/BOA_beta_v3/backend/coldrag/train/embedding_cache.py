@@ -0,0 +1,243 @@
+import os
+import time
+import fcntl
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+EMBED_CACHE = os.getenv("EMBED_CACHE", "true").lower() == "true"
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "output/cache/embeddings")
+EMBED_CACHE_MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX_ROWS", 500000))
+# Compaction keeps this fraction of EMBED_CACHE_MAX_ROWS (most recently used first)
+EMBED_CACHE_KEEP = 0.8
+# Hit/miss counters and last_used times are buffered and written in one transaction
+EMBED_CACHE_FLUSH_ROWS = 1000
+EMBED_CACHE_FLUSH_SECONDS = 5.0
+
+
+def text_hash(text: str, kind: str = "doc") -> bytes:
+    """Cache key; queries and documents are kept apart in case a model embeds them differently."""
+    return hashlib.blake2b(f"{kind}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """
+    text hash -> vector store shared by runs and processes: an append-only float16 matrix
+    (vectors.f16, memory-mapped for reads) plus a SQLite index of hash -> (row, last_used).
+    Appends and compaction take an exclusive file lock, so concurrent workers are safe.
+    Lookups only read SQLite: their counters and LRU times are buffered and flushed in one
+    transaction every EMBED_CACHE_FLUSH_ROWS keys / EMBED_CACHE_FLUSH_SECONDS, and by
+    put_many, stats and close.
+    """
+
+    def __init__(self, model_id: str, dim: Optional[int] = None, cache_dir: str = EMBED_CACHE_DIR,
+                 max_rows: int = EMBED_CACHE_MAX_ROWS):
+        self.dir = Path(cache_dir) / model_id[:16]
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.dir / "vectors.f16"
+        self.lock_path = self.dir / "lock"
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._pending = {"hits": 0, "misses": 0}
+        self._touched: Dict[bytes, float] = {}
+        self._flushed = time.time()
+        self.db = sqlite3.connect(str(self.dir / "index.sqlite"), timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS vectors (hash BLOB PRIMARY KEY, row INTEGER, last_used REAL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL)")
+        self.dim = dim or self._meta("dim")
+        self._mmap = None
+        self._mmap_stamp = None
+
+    # --- Bookkeeping -----------------------------------------------------
+
+    def _meta(self, name: str) -> Optional[int]:
+        row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else None
+
+    def _bump(self, name: str, amount: int) -> None:
+        if amount:
+            self.db.execute("INSERT INTO meta (name, value) VALUES (?, ?) "
+                            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def _record(self, hits: int, misses: int, keys) -> None:
+        self.hits += hits
+        self.misses += misses
+        self._pending["hits"] += hits
+        self._pending["misses"] += misses
+        now = time.time()
+        self._touched.update((k, now) for k in keys)
+        if len(self._touched) >= EMBED_CACHE_FLUSH_ROWS or now - self._flushed >= EMBED_CACHE_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered counters and last_used times."""
+        if any(self._pending.values()) or self._touched:
+            self.db.execute("BEGIN")
+            for name, amount in self._pending.items():
+                self._bump(name, amount)
+            self.db.executemany("UPDATE vectors SET last_used = ? WHERE hash = ?",
+                                [(used, k) for k, used in self._touched.items()])
+            self.db.execute("COMMIT")
+        self._pending = {"hits": 0, "misses": 0}
+        self._touched = {}
+        self._flushed = time.time()
+
+    @contextmanager
+    def _locked(self, shared: bool = False):
+        """Exclusive for appends/compaction; shared for reads so rows never move under a reader."""
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _matrix(self) -> np.ndarray:
+        """Memory-map the vector file, remapping only when it has grown or been compacted (new inode)."""
+        stat = self.vectors_path.stat() if self.vectors_path.exists() else None
+        stamp = (stat.st_ino, stat.st_size) if stat else None
+        if self._mmap is None or stamp != self._mmap_stamp:
+            rows = stat.st_size // (2 * self.dim) if stat else 0
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(rows, self.dim)) \
+                if rows else np.empty((0, self.dim), dtype=np.float16)
+            self._mmap_stamp = stamp
+        return self._mmap
+
+    # --- Lookup / insert ---------------------------------------------------
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, int]:
+        rows: Dict[bytes, int] = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            marks = ",".join("?" * len(batch))
+            rows.update(self.db.execute(f"SELECT hash, row FROM vectors WHERE hash IN ({marks})", batch).fetchall())
+        return rows
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        if not self.dim or not keys:
+            self._record(0, len(keys), [])
+            return [None] * len(keys)
+        with self._locked(shared=True):
+            rows = self._lookup(keys)
+            matrix = self._matrix()
+            found = [np.array(matrix[rows[k]]) if k in rows and rows[k] < len(matrix) else None for k in keys]
+        hits = sum(v is not None for v in found)
+        self._record(hits, len(keys) - hits, rows)
+        return found
+
+    def put_many(self, keys: List[bytes], vectors: List[List[float]]) -> None:
+        if not keys:
+            return
+        block = np.asarray(vectors, dtype=np.float16)
+        self.flush()  # compaction below keeps rows by last_used
+        with self._locked():
+            if not self.dim:
+                self.dim = block.shape[1]
+                self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (self.dim,))
+            # Another process may have stored some of these meanwhile; only append new ones
+            present = set(self._lookup(keys))
+            fresh = []
+            for i, k in enumerate(keys):
+                if k not in present:
+                    present.add(k)
+                    fresh.append(i)
+            if fresh:
+                start = self.vectors_path.stat().st_size // (2 * self.dim) if self.vectors_path.exists() else 0
+                with open(self.vectors_path, "ab") as f:
+                    f.write(block[fresh].tobytes())
+                now = time.time()
+                self.db.execute("BEGIN")
+                self.db.executemany("INSERT OR REPLACE INTO vectors (hash, row, last_used) VALUES (?, ?, ?)",
+                                    [(keys[i], start + n, now) for n, i in enumerate(fresh)])
+                self.db.execute("COMMIT")
+            if self.rows() > self.max_rows:
+                self._compact()
+
+    def rows(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def _compact(self) -> None:
+        """LRU compaction (caller holds the lock): keep the most recently used vectors, rewrite the file."""
+        keep = int(self.max_rows * EMBED_CACHE_KEEP)
+        survivors = self.db.execute("SELECT hash, row, last_used FROM vectors ORDER BY last_used DESC LIMIT ?",
+                                    (keep,)).fetchall()
+        matrix = self._matrix()
+        tmp = self.vectors_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            for start in range(0, len(survivors), 10000):
+                rows = [row for _, row, _ in survivors[start:start + 10000]]
+                f.write(np.asarray(matrix[rows], dtype=np.float16).tobytes())
+        self.db.execute("BEGIN")
+        self.db.execute("DELETE FROM vectors")
+        self.db.executemany("INSERT INTO vectors (hash, row, last_used) VALUES (?, ?, ?)",
+                            [(h, n, used) for n, (h, _, used) in enumerate(survivors)])
+        os.replace(tmp, self.vectors_path)
+        self.db.execute("COMMIT")
+        self._mmap = None
+        print(f"🗜️ Embedding cache compacted to {len(survivors)} vectors")
+
+    def stats(self) -> dict:
+        """This process' counters plus the lifetime totals shared by every process."""
+        self.flush()
+        total_hits, total_misses = self._meta("hits") or 0, self._meta("misses") or 0
+        lookups = total_hits + total_misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": total_hits,
+            "total_misses": total_misses,
+            "hit_rate": round(total_hits / lookups, 4) if lookups else 0.0,
+            "rows": self.rows(),
+            "dim": self.dim,
+            "bytes": self.vectors_path.stat().st_size if self.vectors_path.exists() else 0,
+            "path": str(self.dir),
+        }
+
+    def close(self) -> None:
+        self.flush()
+        self.db.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the wrapped model."""
+
+    def __init__(self, inner: Embeddings, model_id: str, cache_dir: str = EMBED_CACHE_DIR):
+        self.inner = inner
+        self.cache = EmbeddingCache(model_id, cache_dir=cache_dir)
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [text_hash(t, kind) for t in texts]
+        found = self.cache.get_many(keys)
+        missing: Dict[bytes, int] = {}
+        for i, (key, vector) in enumerate(zip(keys, found)):
+            if vector is None and key not in missing:
+                missing[key] = i
+        if missing:
+            batch = [texts[i] for i in missing.values()]
+            vectors = self.inner.embed_documents(batch) if kind == "doc" else [self.inner.embed_query(batch[0])]
+            self.cache.put_many(list(missing), vectors)
+            # Round fresh vectors to float16 too, so results don't depend on whether the cache was warm
+            fresh = dict(zip(missing, np.asarray(vectors, dtype=np.float16)))
+            found = [fresh[k] if v is None else v for k, v in zip(keys, found)]
+        return np.asarray(found, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "doc")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def report(self) -> dict:
+        stats = self.cache.stats()
+        print(f"🧠 Embedding cache: {stats['hits']} hits / {stats['misses']} misses this run, "
+              f"{stats['rows']} vectors stored (lifetime hit rate {stats['hit_rate']:.0%})")
+        return stats
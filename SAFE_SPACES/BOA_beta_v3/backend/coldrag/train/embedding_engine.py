@@ -0,0 +1,181 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", 0))  # 0 = leave torch's / onnxruntime's default
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()  # Options: 'torch', 'onnx'
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/mpnet-finetuned-onnx-int8")
+
+# Written by export_onnx.py; the ONNX backend is only used when its quality check passed for the current model
+ONNX_QUALITY_FILE = "quality.json"
+
+# Files above this size are fingerprinted by size + head/tail blocks instead of full content
+MODEL_HASH_FULL_LIMIT = 8 * 1024 * 1024
+MODEL_HASH_BLOCK = 1024 * 1024
+
+
+def model_fingerprint(model_path: str) -> str:
+    """
+    Content fingerprint of a local embedding model directory (config, tokenizer, weights);
+    hub model names are fingerprinted by name. Cheap enough to run on every start.
+    """
+    root = Path(model_path)
+    if not root.is_dir():
+        return hashlib.sha256(str(model_path).encode("utf-8")).hexdigest()
+    digest = hashlib.sha256()
+    for file in sorted(p for p in root.rglob("*") if p.is_file()):
+        size = file.stat().st_size
+        digest.update(f"{file.relative_to(root)}\0{size}\0".encode("utf-8"))
+        with open(file, "rb") as f:
+            if size <= MODEL_HASH_FULL_LIMIT:
+                digest.update(f.read())
+            else:
+                digest.update(f.read(MODEL_HASH_BLOCK))
+                f.seek(-MODEL_HASH_BLOCK, os.SEEK_END)
+                digest.update(f.read(MODEL_HASH_BLOCK))
+    return digest.hexdigest()
+
+
+def set_embedding_threads(threads: int = EMBED_THREADS) -> None:
+    """Cap torch intra-op threads so embedding does not fight Ollama for every core."""
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def length_buckets(lengths: List[int], batch_size: int) -> List[List[int]]:
+    """Indices sorted by token length, cut into batches: each batch pads only to similar lengths."""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+class BucketedEmbeddings(Embeddings):
+    """
+    SentenceTransformer embedder that tokenizes once to measure lengths, encodes
+    length-sorted batches of EMBED_BATCH_SIZE, and returns vectors in input order.
+    """
+
+    def __init__(self, model_path: str, batch_size: int = EMBED_BATCH_SIZE, threads: int = EMBED_THREADS,
+                 device: str = "cpu"):
+        from sentence_transformers import SentenceTransformer
+        set_embedding_threads(threads)
+        self.model = SentenceTransformer(model_path, device=device)
+        self.tokenizer = self.model.tokenizer
+        self.max_length = self.model.max_seq_length
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.batch_size = batch_size
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        encoded = self.tokenizer(texts, add_special_tokens=True, truncation=True, max_length=self.max_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if texts:
+            for batch in length_buckets(self.token_lengths(texts), self.batch_size):
+                vectors[batch] = self.encode_batch([texts[i] for i in batch])
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+class OnnxEmbeddings(BucketedEmbeddings):
+    """
+    ONNX Runtime (int8) version of the same embedder: tokenizer + transformer graph, then
+    the pooling/normalize steps declared by the exported sentence-transformers config.
+    """
+
+    def __init__(self, onnx_dir: str = ONNX_MODEL_DIR, batch_size: int = EMBED_BATCH_SIZE,
+                 threads: int = EMBED_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        root = Path(onnx_dir)
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_file = root / "model_quantized.onnx"
+        if not model_file.exists():
+            model_file = root / "model.onnx"
+        self.session = ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self.inputs = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(root))
+        self.max_length, self.pooling, self.normalize = self._read_st_config(root)
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _read_st_config(root: Path) -> Tuple[int, str, bool]:
+        max_length, pooling, normalize = 384, "mean", True
+        if (root / "sentence_bert_config.json").exists():
+            max_length = json.loads((root / "sentence_bert_config.json").read_text()).get("max_seq_length", max_length)
+        if (root / "1_Pooling" / "config.json").exists():
+            config = json.loads((root / "1_Pooling" / "config.json").read_text())
+            pooling = "cls" if config.get("pooling_mode_cls_token") else "mean"
+        if (root / "modules.json").exists():
+            modules = json.loads((root / "modules.json").read_text())
+            normalize = any(m["type"].endswith("Normalize") for m in modules)
+        return max_length, pooling, normalize
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        feeds = {name: encoded[name].astype(np.int64) for name in self.inputs if name in encoded}
+        hidden = self.session.run(None, feeds)[0]
+        if self.pooling == "cls":
+            vectors = hidden[:, 0]
+        else:
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+
+def onnx_export_status(model_path: str, onnx_dir: str = ONNX_MODEL_DIR) -> str:
+    """
+    'current' when the export in onnx_dir passed its quality check and was made from the
+    model now at model_path; else 'missing', 'failed' or 'stale' (the model was retrained).
+    """
+    report = Path(onnx_dir) / ONNX_QUALITY_FILE
+    if not report.exists():
+        return "missing"
+    quality = json.loads(report.read_text())
+    if not quality.get("passed", False):
+        return "failed"
+    if quality.get("source_model") != model_fingerprint(model_path):
+        return "stale"
+    return "current"
+
+
+def resolve_embedding_backend(model_path: str, backend: str = EMBEDDING_BACKEND) -> Tuple[str, str]:
+    """
+    (backend, path) actually used for model_path: the ONNX export only when it was made
+    from this model and passed its quality check against it, torch otherwise.
+    """
+    if backend == "onnx":
+        status = onnx_export_status(model_path)
+        if status == "current":
+            return "onnx", ONNX_MODEL_DIR
+        reason = {"missing": "is missing", "failed": "failed its quality check",
+                  "stale": "was exported from a different model (re-run export_onnx.py)"}[status]
+        print(f"⚠️ EMBEDDING_BACKEND=onnx but {ONNX_MODEL_DIR} {reason} — using torch")
+    return "torch", model_path
+
+
+def create_embedder(path: str, backend: str = "torch") -> Embeddings:
+    """Embedder for an already resolved (backend, path) pair."""
+    return OnnxEmbeddings(path) if backend == "onnx" else BucketedEmbeddings(path)
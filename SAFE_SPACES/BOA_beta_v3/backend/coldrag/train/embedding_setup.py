@@ -1,31 +1,122 @@
 # coldrag/scripts/core/embedding_setup.py
 
 import os
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from backend.coldrag.utils.chunk_dedup import DEDUP_CHUNKS, dedup_documents
+from backend.coldrag.train.embedding_cache import EMBED_CACHE, CachedEmbeddings
+from backend.coldrag.train.embedding_engine import create_embedder, resolve_embedding_backend, model_fingerprint
+from backend.coldrag.train.lexical_index import BM25Index
+from backend.coldrag.train.chunking import get_chunker
 
 
 load_dotenv()
 
 # --- Load from .env or use defaults ---
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
-CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
 SEARCH_K = int(os.getenv("SEARCH_K", 10))
-SEARCH_TYPE = os.getenv("SEARCH_TYPE", "mmr")  # Options: 'similarity', 'mmr'
+SEARCH_TYPE = os.getenv("SEARCH_TYPE", "mmr")  # Options: 'similarity', 'mmr', 'hybrid'
 
-def load_embeddings_and_retriever(documents: list, model_path: str = EMBEDDING_MODEL):
-    """Embed documents and return a FAISS retriever with configured search options."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
-    )
-    chunks = splitter.split_documents(documents)
 
-    embeddings = HuggingFaceEmbeddings(model_name=model_path)
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+class LazyEmbeddings(Embeddings):
+    """
+    Embedding engine that is only instantiated on the first embed call, so a
+    persisted index can be loaded (and an unchanged corpus verified) without the model.
+    """
+
+    def __init__(self, model_path: str = EMBEDDING_MODEL):
+        self.model_path = model_path
+        # EMBEDDING_BACKEND resolved once: the ONNX export if it passed its quality check, else torch
+        self.backend, self.backend_path = resolve_embedding_backend(model_path)
+        self._model = None
+
+    @property
+    def model(self) -> Embeddings:
+        if self._model is None:
+            print(f"🧮 Loading embedding model ({self.backend}): {self.backend_path}")
+            self._model = create_embedder(self.backend_path, self.backend)
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+
+def embedding_model_id(model_path: str = EMBEDDING_MODEL) -> str:
+    """Fingerprint of the model that actually embeds for model_path (ONNX export or fp32)."""
+    return model_fingerprint(resolve_embedding_backend(model_path)[1])
+
+
+def create_embeddings(model_path: str = EMBEDDING_MODEL) -> Tuple[Embeddings, str]:
+    """In-process embeddings (lazy model + shared vector cache) and the fingerprint of the model that embeds."""
+    embeddings = LazyEmbeddings(model_path)
+    # The index and cache are keyed by the model that actually embeds, as in embedding_model_id()
+    model_id = model_fingerprint(embeddings.backend_path)
+    if EMBED_CACHE:
+        embeddings = CachedEmbeddings(embeddings, model_id)
+    return embeddings, model_id
+
+
+def split_documents(documents: list, model_path: str = EMBEDDING_MODEL) -> list:
+    """Chunk documents to the embedding model's token limit (CHUNKER=chars: CHUNK_SIZE characters)."""
+    return get_chunker(model_path).split_documents(documents)
+
+
+def load_embeddings_and_retriever(documents: list, model_path: str = EMBEDDING_MODEL,
+                                  reference_dir: Optional[str] = None):
+    """
+    Embed documents and return a FAISS retriever with configured search options.
+    With reference_dir, retrieval is two-tier: documents (the plan) get a small in-memory
+    index, the reference corpus is the persisted index synced incrementally, and results of
+    both are merged by tier-weighted cosine score — a new plan only embeds its own resources.
+    SEARCH_TYPE=hybrid adds a BM25 index per tier and fuses all rankings with RRF.
+    When the embedding daemon is running (daemon/server.py), embedding and the reference
+    tier are served by it; otherwise everything runs in this process.
+    """
+    chunks = split_documents(documents, model_path)
+    get_chunker(model_path).report("plan chunks")
+    if DEDUP_CHUNKS:
+        chunks = dedup_documents(chunks)
+
+    hybrid = SEARCH_TYPE == "hybrid"
+    # A running embedding daemon already holds the model and the reference index warm
+    from backend.coldrag.daemon.client import daemon_client
+    client = daemon_client(model_path)
+    if client is not None:
+        from backend.coldrag.daemon.client import DaemonEmbeddings
+        embeddings = DaemonEmbeddings(client)
+    else:
+        embeddings, model_id = create_embeddings(model_path)
+    vectorstore = FAISS.from_documents(chunks, embeddings) if chunks else None
+    # The lexical index is built from the same chunks in the same pass
+    lexical = BM25Index.from_vectorstore(vectorstore) if hybrid and vectorstore is not None else None
+
+    from backend.coldrag.train.tiered_retriever import TieredRetriever, LocalTier, PLAN_TIER_WEIGHT, REFERENCE_TIER_WEIGHT
+    reference_tier = None
+    if reference_dir and client is not None:
+        from backend.coldrag.daemon.client import RemoteTier
+        reference_tier = RemoteTier("reference", client, reference_dir, REFERENCE_TIER_WEIGHT, lexical=hybrid)
+    elif reference_dir:
+        from backend.coldrag.train.reference_index import sync_reference_index, reference_lexical_index
+        reference_store = sync_reference_index(reference_dir, embeddings, model_id=model_id)
+        if reference_store is not None:
+            reference_lexical = reference_lexical_index(reference_store) if hybrid else None
+            reference_tier = LocalTier("reference", reference_store, REFERENCE_TIER_WEIGHT, reference_lexical)
+
+    if isinstance(embeddings, CachedEmbeddings):
+        embeddings.report()
+
+    if reference_tier is not None or hybrid:
+        tiers = [LocalTier("plan", vectorstore, PLAN_TIER_WEIGHT, lexical)] + ([reference_tier] if reference_tier else [])
+        return TieredRetriever(tiers=tiers, embeddings=embeddings, search_type=SEARCH_TYPE, k=SEARCH_K)
 
     retriever = vectorstore.as_retriever(
         search_type=SEARCH_TYPE,
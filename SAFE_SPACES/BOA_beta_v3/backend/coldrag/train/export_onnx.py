@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Export the fine-tuned embedder to ONNX (dynamic int8) and check it against the fp32 model."""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from pathlib import Path
+import numpy as np
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+
+from backend.coldrag.train.training_pairs import compliance_pairs
+from backend.coldrag.train.embedding_engine import (
+    ONNX_MODEL_DIR, ONNX_QUALITY_FILE, BucketedEmbeddings, OnnxEmbeddings, model_fingerprint, onnx_export_status
+)
+
+load_dotenv()
+
+MODEL_OUTPUT_DIR = os.getenv("MODEL_OUTPUT_DIR", "models/mpnet-finetuned")
+ONNX_MIN_COSINE = float(os.getenv("ONNX_MIN_COSINE", 0.99))  # mean fp32 vs int8 cosine required
+ONNX_MAX_RECALL_DROP = float(os.getenv("ONNX_MAX_RECALL_DROP", 0.02))  # allowed question->answer recall@k loss
+
+# sentence-transformers files the ONNX backend reads for max length, pooling and normalization
+ST_CONFIG_FILES = ["modules.json", "sentence_bert_config.json", "1_Pooling"]
+
+
+def export_int8(model_dir: str, onnx_dir: str, arch: str = "avx2") -> Path:
+    """Transformer -> model.onnx, then dynamic int8 model_quantized.onnx (no calibration data needed)."""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    out = Path(onnx_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    print(f"📦 Exporting {model_dir} to ONNX...")
+    ORTModelForFeatureExtraction.from_pretrained(model_dir, export=True).save_pretrained(out)
+    AutoTokenizer.from_pretrained(model_dir).save_pretrained(out)
+    for name in ST_CONFIG_FILES:
+        source = Path(model_dir) / name
+        if source.is_dir():
+            shutil.copytree(source, out / name, dirs_exist_ok=True)
+        elif source.exists():
+            shutil.copy2(source, out / name)
+
+    print(f"🗜️ Quantizing to int8 ({arch}, dynamic)...")
+    config = getattr(AutoQuantizationConfig, arch)(is_static=False, per_channel=False)
+    ORTQuantizer.from_pretrained(out, file_name="model.onnx").quantize(save_dir=out, quantization_config=config)
+    return out / "model_quantized.onnx"
+
+
+def recall_at_k(questions: np.ndarray, answers: np.ndarray, k: int) -> float:
+    """Share of questions whose own answer is among the k nearest answers."""
+    scores = questions @ answers.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return float(np.mean([i in row for i, row in enumerate(top)]))
+
+
+def quality_check(model_dir: str, onnx_dir: str, ks=(1, 5)) -> dict:
+    """Compare the int8 export with the fp32 model on compliance_pairs; writes quality.json."""
+    questions = [q.strip("'") for q, _ in compliance_pairs]
+    answers = [a.strip("'") for _, a in compliance_pairs]
+    fp32, int8 = BucketedEmbeddings(model_dir), OnnxEmbeddings(onnx_dir)
+
+    # Ties the export to the fp32 model it was made from; a retrained model invalidates it
+    report = {"source_model": model_fingerprint(model_dir), "pairs": len(compliance_pairs), "cosine": {}, "recall": {}}
+    vectors = {}
+    for name, model in (("fp32", fp32), ("int8", int8)):
+        q, a = model.encode(questions), model.encode(answers)
+        norm = lambda m: m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+        vectors[name] = (norm(q), norm(a))
+        report["recall"][name] = {f"@{k}": recall_at_k(*vectors[name], k) for k in ks}
+
+    cosines = np.concatenate([(vectors["fp32"][i] * vectors["int8"][i]).sum(axis=1) for i in (0, 1)])
+    report["cosine"] = {"mean": round(float(cosines.mean()), 5), "min": round(float(cosines.min()), 5)}
+    drop = max(report["recall"]["fp32"][f"@{k}"] - report["recall"]["int8"][f"@{k}"] for k in ks)
+    report["max_recall_drop"] = round(drop, 4)
+    report["thresholds"] = {"min_cosine": ONNX_MIN_COSINE, "max_recall_drop": ONNX_MAX_RECALL_DROP}
+    report["passed"] = report["cosine"]["mean"] >= ONNX_MIN_COSINE and drop <= ONNX_MAX_RECALL_DROP
+
+    with open(Path(onnx_dir) / ONNX_QUALITY_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+    recalls = " | ".join(f"{name} " + ", ".join(f"R{k}={v:.2f}" for k, v in r.items())
+                         for name, r in report["recall"].items())
+    print(f"📏 Cosine fp32 vs int8: mean {report['cosine']['mean']:.4f}, min {report['cosine']['min']:.4f}")
+    print(f"🎯 Recall: {recalls}")
+    print("✅ int8 model passed the quality check" if report["passed"]
+          else "❌ int8 model failed the quality check — the torch backend will stay in use")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the fine-tuned embedding model to ONNX int8")
+    parser.add_argument("--model", default=MODEL_OUTPUT_DIR, help="SentenceTransformer directory (fp32)")
+    parser.add_argument("--out", default=ONNX_MODEL_DIR, help="Output directory (default: ONNX_MODEL_DIR)")
+    parser.add_argument("--arch", default="avx2", choices=["avx2", "avx512", "avx512_vnni", "arm64"],
+                        help="Target CPU instruction set for the quantized kernels")
+    parser.add_argument("--check-only", action="store_true", help="Skip the export, rerun the quality check")
+    parser.add_argument("--is-current", action="store_true",
+                        help="Exit 0 if --out holds a passing export of --model, 1 otherwise (no export)")
+    args = parser.parse_args()
+
+    if args.is_current:
+        status = onnx_export_status(args.model, args.out)
+        print(f"🔎 ONNX export in {args.out}: {status}")
+        sys.exit(0 if status == "current" else 1)
+
+    if not args.check_only:
+        export_int8(args.model, args.out, args.arch)
+    quality_check(args.model, args.out)
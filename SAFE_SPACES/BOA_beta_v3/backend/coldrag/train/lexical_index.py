@@ -0,0 +1,111 @@
+import os
+import re
+import math
+import pickle
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+LEXICAL_FILE = "lexical.pkl"
+
+# Identifiers stay whole (aws_s3_bucket_public_access_block, AC.L2-3.1.1, kms_key_id, arn:aws:...)
+_TOKEN = re.compile(r"[a-z0-9]+(?:[_.:/-][a-z0-9]+)*")
+_SEPARATORS = re.compile(r"[_.:/-]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens; compound identifiers are indexed whole and by their (non-numeric) parts."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if _SEPARATORS.search(token):
+            tokens.extend(part for part in _SEPARATORS.split(token) if part and not part.isdigit())
+    return tokens
+
+
+class BM25Index:
+    """In-memory inverted index (term -> doc positions, term frequencies) scored with Okapi BM25."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.key: Optional[str] = None
+
+    @classmethod
+    def from_texts(cls, texts: List[str], ids: List[str]) -> "BM25Index":
+        index = cls()
+        building: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths = []
+        for position, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                docs, tfs = building.setdefault(term, ([], []))
+                docs.append(position)
+                tfs.append(tf)
+        index.ids = list(ids)
+        index.lengths = np.asarray(lengths, dtype=np.float32)
+        index.postings = {term: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+                          for term, (docs, tfs) in building.items()}
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "BM25Index":
+        """Index a LangChain FAISS store's documents under their docstore IDs."""
+        ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+        return cls.from_texts([vectorstore.docstore.search(cid).page_content for cid in ids], ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (docstore ID, BM25 score) for query; documents sharing no term are not returned."""
+        if not self.ids:
+            return []
+        n = len(self.ids)
+        average = float(self.lengths.mean()) or 1.0
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[docs] / average)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k)[:k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [(self.ids[i], float(scores[i])) for i in hits]
+
+    def save(self, path: Path) -> None:
+        tmp = Path(path).with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def lexical_index_for(vectorstore, index_dir: str, key: str) -> BM25Index:
+    """BM25 index over a persisted store's documents, saved as lexical.pkl and reused while key matches."""
+    path = Path(index_dir) / LEXICAL_FILE
+    if path.exists():
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if index.key == key and len(index) == len(vectorstore.index_to_docstore_id):
+            return index
+    index = BM25Index.from_vectorstore(vectorstore)
+    index.key = key
+    index.save(path)
+    print(f"🔤 Built lexical (BM25) index over {len(index)} chunks, {len(index.postings)} terms")
+    return index
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+from backend.coldrag.train.embedding_setup import EMBEDDING_MODEL, split_documents
+from backend.coldrag.train.chunking import chunker_settings, get_chunker
+from backend.coldrag.utils.reference_cache import content_sha256
+from backend.coldrag.utils.reference_loader import list_reference_files, load_reference_files
+from backend.coldrag.train.streaming_ingest import (
+    INGEST_STREAMING, chunk_id_prefix, stream_into_index, collapse_duplicates, apply_provenance, owned_ids
+)
+from backend.coldrag.utils.chunk_dedup import DEDUP_CHUNKS, DEDUP_THRESHOLD, ChunkDeduper
+from backend.coldrag.train.ann_index import index_kind, load_store, fit_store, save_store
+from backend.coldrag.train.lexical_index import BM25Index, lexical_index_for
+
+load_dotenv()
+
+REF_INDEX = os.getenv("REF_INDEX", "true").lower() == "true"
+REF_INDEX_DIR = os.getenv("REF_INDEX_DIR", "output/cache/reference_index")
+REF_INDEX_VERSION = 2
+
+
+def corpus_fingerprint(files: Dict[str, Path]) -> str:
+    """Hash of the corpus listing (path, size, mtime) — stat calls only, no file reads."""
+    digest = hashlib.sha256()
+    for key in sorted(files):
+        stat = files[key].stat()
+        digest.update(f"{key}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def index_settings(model_id: str) -> dict:
+    """Everything besides the corpus that determines the vectors in the index."""
+    return {"model": model_id, "chunker": chunker_settings(EMBEDDING_MODEL),
+            "dedup": DEDUP_THRESHOLD if DEDUP_CHUNKS else None}
+
+
+def chunk_ids_for(path_key: str, count: int) -> List[str]:
+    """Stable per-file chunk IDs, e.g. 3f2a...:0, 3f2a...:1."""
+    prefix = chunk_id_prefix(path_key)
+    return [f"{prefix}:{i}" for i in range(count)]
+
+
+def search_key(corpus_hash: Optional[str], settings: dict) -> str:
+    """Identifies the indexed content for derived (lexical) indexes: corpus + index settings."""
+    return hashlib.sha256(json.dumps([corpus_hash, settings], sort_keys=True).encode()).hexdigest()
+
+
+class ReferenceIndexManifest:
+    """Which reference file (by size/mtime/sha256) produced which chunk IDs in the persisted index."""
+
+    def __init__(self, index_dir: str, settings: dict):
+        self.path = Path(index_dir) / "manifest.json"
+        self.settings = settings
+        self.files: Dict[str, dict] = {}
+        self.corpus_hash: Optional[str] = None
+        if self.path.exists():
+            with open(self.path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") == REF_INDEX_VERSION and manifest.get("settings") == settings:
+                self.files = manifest.get("files", {})
+                self.corpus_hash = manifest.get("corpus_hash")
+            else:
+                print("♻️ Reference index settings changed — rebuilding from scratch")
+
+    def is_current(self, key: str, file: Path) -> bool:
+        entry = self.files.get(key)
+        if entry is None:
+            return False
+        stat = file.stat()
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["mtime_ns"] != stat.st_mtime_ns:
+            if content_sha256(file) != entry["sha256"]:
+                return False
+            entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def record(self, key: str, file: Path, chunk_ids: List[str]) -> None:
+        stat = file.stat()
+        self.files[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                           "sha256": content_sha256(file), "chunk_ids": chunk_ids}
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": REF_INDEX_VERSION, "settings": self.settings, "corpus_hash": self.corpus_hash,
+                       "files": self.files}, f)
+        os.replace(tmp, self.path)
+
+
+def sync_reference_index(directory: str, embeddings, model_id: str,
+                         index_dir: str = REF_INDEX_DIR) -> Optional[FAISS]:
+    """
+    Bring the persisted reference FAISS index in line with directory: only files that were
+    added, modified or deleted since the last run are (re)chunked, embedded or removed.
+    The index is keyed by (corpus hash, model fingerprint, chunker settings); when
+    the key matches it is loaded as is and embeddings (e.g. LazyEmbeddings) are never called.
+    The store searches a size-adaptive index (flat / HNSW / IVF-PQ, see ann_index.py) that
+    changed files are added to and deleted from in place; it is only rebuilt when its kind
+    or parameters change or too many of its rows were deleted.
+    """
+    start = time.perf_counter()
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    manifest = ReferenceIndexManifest(index_dir, index_settings(model_id))
+    files = {str(file.resolve()): file for file in list_reference_files(directory)}
+    corpus_hash = corpus_fingerprint(files)
+    if manifest.files and corpus_hash == manifest.corpus_hash:
+        loaded = load_store(index_dir, embeddings)
+        if loaded is not None:
+            vectorstore = fit_store(loaded, index_dir)  # e.g. ANN settings changed
+            if vectorstore is not loaded:
+                save_store(vectorstore, index_dir)
+            print(f"⚡ Reference index up to date ({len(vectorstore.index_to_docstore_id)} vectors, "
+                  f"{index_kind(vectorstore.index)}, loaded in {time.perf_counter() - start:.2f}s)")
+            return vectorstore
+
+    vectorstore = load_store(index_dir, embeddings) if manifest.files else None
+    if vectorstore is None:
+        manifest.files = {}
+    removed = [key for key in manifest.files if key not in files]
+    changed = [key for key, file in files.items() if not manifest.is_current(key, file)]
+
+    # Files credited with a collapsed duplicate owned by an invalidated file are re-ingested too
+    invalid = set(removed) | set(changed)
+    while True:
+        stale_ids = {cid for key in invalid for cid in owned_ids(key, manifest.files.get(key, {}).get("chunk_ids", []))}
+        sharing = {key for key, entry in manifest.files.items()
+                   if key not in invalid and stale_ids & set(entry["chunk_ids"])}
+        if not sharing:
+            break
+        invalid |= sharing
+        changed += sorted(sharing)
+    if stale_ids and vectorstore is not None:
+        vectorstore.delete(list(stale_ids))
+    for key in invalid:
+        manifest.files.pop(key, None)  # changed files are re-recorded once indexed again
+
+    before = len(vectorstore.index_to_docstore_id) if vectorstore is not None else 0
+    deduper = ChunkDeduper() if DEDUP_CHUNKS else None
+    if changed and INGEST_STREAMING:
+        # page -> chunk -> embedding batch, never holding a whole document in memory
+        vectorstore, ids_by_key = stream_into_index({key: files[key] for key in changed}, embeddings, vectorstore,
+                                                    deduper=deduper)
+    elif changed:
+        per_file = load_reference_files([files[key] for key in changed])
+        items = []
+        for key, file_docs in zip(changed, per_file):
+            if not file_docs:  # failed to load: leave it out so the next run retries
+                continue
+            chunks = split_documents(file_docs)
+            items.extend(zip([key] * len(chunks), chunks, chunk_ids_for(key, len(chunks))))
+        ids_by_key = {key: [] for key in changed}
+        provenance = defaultdict(list)
+        kept = collapse_duplicates(items, deduper, [], ids_by_key, provenance)
+        if deduper is not None:
+            deduper.report()
+        if kept:
+            new_chunks = [chunk for _, chunk, _ in kept]
+            new_ids = [cid for _, _, cid in kept]
+            if vectorstore is None:
+                vectorstore = FAISS.from_documents(new_chunks, embeddings, ids=new_ids)
+            else:
+                vectorstore.add_documents(new_chunks, ids=new_ids)
+            apply_provenance(vectorstore, provenance)
+    else:
+        ids_by_key = {}
+    if changed:
+        get_chunker(EMBEDDING_MODEL).report("reference chunks")
+    for key, ids in ids_by_key.items():
+        if ids:
+            manifest.record(key, files[key], ids)
+    added = (len(vectorstore.index_to_docstore_id) if vectorstore is not None else 0) - before
+
+    if vectorstore is None or not vectorstore.index_to_docstore_id:
+        # Nothing indexed (empty or fully deleted corpus): drop the on-disk index too
+        shutil.rmtree(index_dir, ignore_errors=True)
+        print(f"⚠️ No reference documents indexed from: {directory}")
+        return None
+
+    vectorstore = fit_store(vectorstore, index_dir)
+    save_store(vectorstore, index_dir)
+    # Hash of what is indexed: differs from the listing's hash while files failed, so the
+    # next run retries them, and still identifies the content for the lexical index key
+    manifest.corpus_hash = corpus_fingerprint({key: file for key, file in files.items() if key in manifest.files})
+    manifest.save()
+    print(f"📚 Reference index synced in {time.perf_counter() - start:.1f}s: "
+          f"+{added} chunks from {len(changed)} new/changed files, "
+          f"-{len(stale_ids)} stale chunks ({len(removed)} removed files), "
+          f"{len(vectorstore.index_to_docstore_id)} vectors total ({index_kind(vectorstore.index)})")
+    return vectorstore
+
+
+def reference_lexical_index(vectorstore: FAISS, index_dir: str = REF_INDEX_DIR) -> BM25Index:
+    """BM25 index of the synced reference store, persisted with it and rebuilt when the corpus changes."""
+    with open(Path(index_dir) / "manifest.json") as f:
+        manifest = json.load(f)
+    return lexical_index_for(vectorstore, index_dir, search_key(manifest.get("corpus_hash"), manifest.get("settings")))
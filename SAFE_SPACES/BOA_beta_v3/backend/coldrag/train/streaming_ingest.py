@@ -0,0 +1,183 @@
+import os
+import queue
+import hashlib
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+from langchain_community.document_loaders import PyPDFLoader
+from backend.coldrag.train.embedding_setup import EMBEDDING_MODEL
+from backend.coldrag.train.chunking import get_chunker
+from backend.coldrag.utils.reference_loader import load_reference_file
+from backend.coldrag.utils.chunk_dedup import ChunkDeduper, describe_source
+
+load_dotenv()
+
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "true").lower() == "true"
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+INGEST_QUEUE_BATCHES = int(os.getenv("INGEST_QUEUE_BATCHES", 4))
+
+# (file key, chunk, chunk id)
+ChunkItem = Tuple[str, object, str]
+
+_DONE = object()
+
+
+def chunk_id_prefix(path_key: str) -> str:
+    return hashlib.sha256(path_key.encode("utf-8")).hexdigest()[:16]
+
+
+def iter_document_pages(file: Path) -> Iterator:
+    """Yield a file's Documents one page at a time (PDFs are never fully materialized)."""
+    if file.suffix.lower() == ".pdf":
+        yield from PyPDFLoader(str(file)).lazy_load()
+    else:
+        yield from load_reference_file(file)
+
+
+def iter_file_chunks(files: Dict[str, Path], failed: Set[str]) -> Iterator[ChunkItem]:
+    """
+    page -> chunk generator over many files. Chunk IDs are "<path hash>:<n>" per file; a
+    file that raises part-way is added to failed (its earlier chunks are removed later).
+    """
+    chunker = get_chunker(EMBEDDING_MODEL)
+    for key, file in files.items():
+        prefix = chunk_id_prefix(key)
+        n = 0
+        try:
+            for page in iter_document_pages(file):
+                for chunk in chunker.split_documents([page]):
+                    yield key, chunk, f"{prefix}:{n}"
+                    n += 1
+        except Exception as e:
+            failed.add(key)
+            print(f"❌ Failed to stream {file.name}: {type(e).__name__}: {e}")
+
+
+def collapse_duplicates(batch: List[ChunkItem], deduper: Optional[ChunkDeduper], kept_ids: List[str],
+                        ids_by_key: Dict[str, List[str]], provenance: Dict[str, List[str]]) -> List[ChunkItem]:
+    """
+    Drop near-duplicates from a batch before embedding. A duplicate's file is credited with
+    the representative's chunk ID and its source is added to the representative's provenance.
+    """
+    if deduper is None:
+        kept = batch
+    else:
+        kept = []
+        for item in batch:
+            key, chunk, cid = item
+            representative = deduper.add(chunk.page_content)
+            if representative is None:
+                kept_ids.append(cid)
+                kept.append(item)
+            else:
+                rep_id = kept_ids[representative]
+                if rep_id not in ids_by_key[key]:
+                    ids_by_key[key].append(rep_id)
+                provenance[rep_id].append(describe_source(chunk.metadata))
+    for key, _, cid in kept:
+        ids_by_key[key].append(cid)
+    return kept
+
+
+def apply_provenance(vectorstore: FAISS, provenance: Dict[str, List[str]]) -> None:
+    """Write collapsed-duplicate sources into the representatives' stored metadata."""
+    for rep_id, sources in provenance.items():
+        doc = vectorstore.docstore.search(rep_id)
+        if sources and not isinstance(doc, str):
+            doc.metadata.setdefault("duplicate_sources", []).extend(sources)
+            doc.metadata["duplicate_count"] = len(doc.metadata["duplicate_sources"])
+
+
+def owned_ids(key: str, ids: List[str]) -> List[str]:
+    """Chunk IDs a file produced itself (as opposed to representatives it shares with other files)."""
+    prefix = f"{chunk_id_prefix(key)}:"
+    return [cid for cid in ids if cid.startswith(prefix)]
+
+
+def _produce(items: Iterator[ChunkItem], batch_size: int, out: queue.Queue) -> None:
+    """Producer thread: group chunks into batches; put() blocks while the queue is full."""
+    try:
+        batch: List[ChunkItem] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                out.put(batch)
+                batch = []
+        if batch:
+            out.put(batch)
+        out.put(_DONE)
+    except BaseException as e:
+        out.put(e)
+
+
+def stream_into_index(files: Dict[str, Path], embeddings, vectorstore: Optional[FAISS] = None,
+                      batch_size: int = INGEST_BATCH_SIZE, queue_batches: int = INGEST_QUEUE_BATCHES,
+                      deduper: Optional[ChunkDeduper] = None) -> Tuple[Optional[FAISS], Dict[str, List[str]]]:
+    """
+    Stream files through page -> chunk -> (dedup ->) embedding batch into a FAISS store.
+    Reading/splitting runs in a producer thread ahead of the embedder, bounded to
+    queue_batches batches in flight, so memory stays flat regardless of document size.
+    Returns the store and {file key: chunk IDs} for the files that loaded completely.
+    """
+    failed: Set[str] = set()
+    kept_ids: List[str] = []
+    provenance: Dict[str, List[str]] = defaultdict(list)
+    ids_by_key: Dict[str, List[str]] = {key: [] for key in files}
+    batches: queue.Queue = queue.Queue(maxsize=max(1, queue_batches))
+    producer = threading.Thread(target=_produce, args=(iter_file_chunks(files, failed), batch_size, batches),
+                                daemon=True)
+    producer.start()
+
+    embedded = 0
+    while True:
+        batch = batches.get()
+        if batch is _DONE:
+            break
+        if isinstance(batch, BaseException):
+            raise batch
+        embedded += len(batch)
+        batch = collapse_duplicates(batch, deduper, kept_ids, ids_by_key, provenance)
+        if not batch:
+            continue
+        texts = [chunk.page_content for _, chunk, _ in batch]
+        metadatas = [chunk.metadata for _, chunk, _ in batch]
+        ids = [cid for _, _, cid in batch]
+        vectors = embeddings.embed_documents(texts)
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=ids)
+        else:
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+    producer.join()
+
+    if vectorstore is not None:
+        drop_files(vectorstore, ids_by_key, failed)
+        apply_provenance(vectorstore, provenance)
+    for key in [k for k, ids in ids_by_key.items() if not ids]:
+        del ids_by_key[key]
+
+    print(f"🌊 Streamed {embedded} chunks from {len(files)} files in batches of {batch_size} "
+          f"(≤{queue_batches} batches buffered)")
+    if deduper is not None:
+        deduper.report()
+    return vectorstore, ids_by_key
+
+
+def drop_files(vectorstore: FAISS, ids_by_key: Dict[str, List[str]], keys: Set[str]) -> None:
+    """
+    Remove the chunks of the given files (e.g. failed mid-stream, so the next run retries them
+    cleanly). Files that shared a removed representative are dropped too, transitively.
+    """
+    doomed = set(keys)
+    while True:
+        deleted = {cid for key in doomed for cid in owned_ids(key, ids_by_key.get(key, []))}
+        sharing = {key for key, ids in ids_by_key.items() if key not in doomed and deleted & set(ids)}
+        if not sharing:
+            break
+        doomed |= sharing
+    if deleted:
+        vectorstore.delete(list(deleted))
+    for key in doomed:
+        ids_by_key.pop(key, None)
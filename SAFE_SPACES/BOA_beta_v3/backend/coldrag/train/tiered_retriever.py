@@ -0,0 +1,138 @@
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from pydantic import ConfigDict
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+load_dotenv()
+
+TIER_FETCH_K = int(os.getenv("TIER_FETCH_K", 20))  # candidates taken from each tier before merging
+PLAN_TIER_WEIGHT = float(os.getenv("PLAN_TIER_WEIGHT", 1.0))
+REFERENCE_TIER_WEIGHT = float(os.getenv("REFERENCE_TIER_WEIGHT", 1.0))
+RRF_K = int(os.getenv("RRF_K", 60))  # reciprocal rank fusion damping: score = Σ 1 / (RRF_K + rank)
+MMR_LAMBDA = 0.5
+
+# (docstore ID, document, distance (vector) or BM25 score (lexical), vector or None)
+Hit = Tuple[str, Document, float, Optional[np.ndarray]]
+
+
+def cosine_scores(query_vector: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of each candidate to the query. Computed from the vectors, not the index
+    distances: tiers use different index types (exact flat vs HNSW / IVF-PQ), and an absolute
+    score keeps a weak best hit of one tier from ranking like a strong hit of another.
+    """
+    norms = np.linalg.norm(vectors, axis=1) * max(float(np.linalg.norm(query_vector)), 1e-12)
+    return (vectors @ query_vector) / np.clip(norms, 1e-12, None)
+
+
+def weighted_mmr(scores: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """
+    Maximal marginal relevance with the tier-weighted scores as the relevance term and
+    cosine similarity to already selected candidates as the redundancy term.
+    """
+    unit = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    chosen: List[int] = []
+    redundancy = np.full(len(scores), -np.inf)
+    while len(chosen) < min(k, len(scores)):
+        value = lambda_mult * scores - (1 - lambda_mult) * np.where(np.isinf(redundancy), 0.0, redundancy)
+        value[chosen] = -np.inf
+        best = int(np.argmax(value))
+        chosen.append(best)
+        redundancy = np.maximum(redundancy, unit @ unit[best])
+    return chosen
+
+
+def reciprocal_rank_fusion(rankings: List[Tuple[List[str], float]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists ([(ids best first, weight)]) by weighted Σ 1 / (k + rank), best first."""
+    fused: Dict[str, float] = defaultdict(float)
+    for ids, weight in rankings:
+        for rank, doc_id in enumerate(ids, 1):
+            fused[doc_id] += weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class LocalTier:
+    """A FAISS store (and optionally its BM25 index) searched in this process."""
+
+    def __init__(self, name: str, store, weight: float = 1.0, lexical=None):
+        self.name = name
+        self.store = store
+        self.weight = weight
+        self.lexical = lexical
+
+    def vector_hits(self, query_vector: np.ndarray, k: int) -> List[Hit]:
+        store = self.store
+        if store is None or store.index.ntotal == 0:
+            return []
+        distances, positions = store.index.search(query_vector[None, :].astype(np.float32), min(k, store.index.ntotal))
+        hits = []
+        for distance, position in zip(distances[0], positions[0]):
+            if position == -1:
+                continue
+            doc_id = store.index_to_docstore_id[int(position)]
+            hits.append((doc_id, store.docstore.search(doc_id), float(distance), store.index.reconstruct(int(position))))
+        return hits
+
+    def lexical_hits(self, query: str, k: int) -> List[Hit]:
+        if self.lexical is None or self.store is None:
+            return []
+        return [(doc_id, self.store.docstore.search(doc_id), score, None) for doc_id, score in self.lexical.search(query, k)]
+
+
+class TieredRetriever(BaseRetriever):
+    """
+    Searches several tiers — the small per-plan index built in memory and the persisted,
+    shared reference index (local, or served by the embedding daemon) — and merges their
+    candidates by tier-weighted cosine score, which is also the relevance term of MMR.
+    Tiers are only read, so the reference index never absorbs plan chunks. With search_type "hybrid", each tier's vector ranking and BM25
+    ranking are fused across all tiers with reciprocal rank fusion instead.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tiers: list  # LocalTier / daemon RemoteTier
+    embeddings: object
+    search_type: str = "mmr"
+    k: int = 10
+    fetch_k: int = TIER_FETCH_K
+
+    @staticmethod
+    def _tagged(doc: Document, tier: str, score: float) -> Document:
+        return Document(page_content=doc.page_content, metadata={**doc.metadata, "tier": tier, "score": round(score, 4)})
+
+    def candidates(self, query_vector: np.ndarray) -> List[Tuple[Document, float, np.ndarray]]:
+        found = []
+        for tier in self.tiers:
+            hits = tier.vector_hits(query_vector, self.fetch_k)
+            if not hits:
+                continue
+            vectors = np.stack([np.asarray(h[3], dtype=np.float32) for h in hits])
+            scores = cosine_scores(query_vector, vectors) * tier.weight
+            found.extend((self._tagged(doc, tier.name, float(score)), float(score), vector)
+                         for score, vector, (_, doc, _, _) in zip(scores, vectors, hits))
+        found.sort(key=lambda c: c[1], reverse=True)
+        return found
+
+    def hybrid(self, query: str, query_vector: np.ndarray) -> List[Document]:
+        rankings, docs = [], {}
+        for tier in self.tiers:
+            for hits in (tier.vector_hits(query_vector, self.fetch_k), tier.lexical_hits(query, self.fetch_k)):
+                for doc_id, doc, _, _ in hits:
+                    docs[(tier.name, doc_id)] = doc
+                rankings.append(([(tier.name, doc_id) for doc_id, _, _, _ in hits], tier.weight))
+        fused = reciprocal_rank_fusion(rankings)[:self.k]
+        return [self._tagged(docs[key], key[0], score) for key, score in fused]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        if self.search_type == "hybrid":
+            return self.hybrid(query, query_vector)
+        found = self.candidates(query_vector)
+        if self.search_type == "mmr" and found:
+            chosen = weighted_mmr(np.array([c[1] for c in found]), np.stack([c[2] for c in found]), self.k)
+            return [found[i][0] for i in chosen]
+        return [c[0] for c in found[:self.k]]
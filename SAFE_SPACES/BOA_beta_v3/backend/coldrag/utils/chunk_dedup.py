@@ -0,0 +1,148 @@
+import os
+import re
+import zlib
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEDUP_CHUNKS = os.getenv("DEDUP_CHUNKS", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.9))  # estimated Jaccard similarity to collapse
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", 128))
+DEDUP_SHINGLE = int(os.getenv("DEDUP_SHINGLE", 9))  # character shingles work for prose and compact JSON alike
+
+_PRIME = (1 << 31) - 1
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def shingle_hashes(text: str, k: int = DEDUP_SHINGLE) -> np.ndarray:
+    """31-bit hashes of the distinct byte k-grams of text (polynomial hash over sliding windows)."""
+    data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+    if len(data) <= k:
+        return np.array([zlib.crc32(text.encode("utf-8")) % _PRIME], dtype=np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(data, k)
+    powers = np.array([pow(257, k - 1 - i, 1 << 64) for i in range(k)], dtype=np.uint64)
+    mixed = (windows * powers).sum(axis=1, dtype=np.uint64)  # wraps mod 2**64
+    return np.unique((mixed ^ (mixed >> np.uint64(29))) % np.uint64(_PRIME))
+
+
+def lsh_shape(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows == num_perm whose LSH S-curve midpoint (1/b)^(1/r)
+    sits just below threshold, so true near-duplicates almost always share a band.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold * 0.9:
+            best = (bands, rows)
+    return best
+
+
+class ChunkDeduper:
+    """
+    Streaming near-duplicate detector: exact duplicates by hash, near duplicates by
+    MinHash signatures bucketed with LSH banding and confirmed by estimated Jaccard.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 shingle: int = DEDUP_SHINGLE, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.shingle = shingle
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self.bands, self.rows = lsh_shape(num_perm, threshold)
+        self.buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self.exact: Dict[str, int] = {}
+        self.signatures = np.empty((1024, num_perm), dtype=np.uint64)  # grows by doubling
+        self.count = 0
+        self.seen = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingle_hashes(text, self.shingle)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, text: str) -> Optional[int]:
+        """
+        Register text. Returns the index (in order of first appearance among kept texts) of
+        the representative it duplicates, or None if it is new and was kept.
+        """
+        self.seen += 1
+        normalized = normalize_text(text)
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+        if digest in self.exact:
+            return self.exact[digest]
+
+        signature = self.signature(normalized)
+        raw = signature.tobytes()
+        width = self.rows * signature.itemsize
+        band_keys = [raw[i * width:(i + 1) * width] for i in range(self.bands)]
+        candidates = {c for band, key in zip(self.buckets, band_keys) for c in band.get(key, ())}
+        if candidates:
+            ordered = np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+            similarity = (self.signatures[ordered] == signature).mean(axis=1)
+            matches = np.flatnonzero(similarity >= self.threshold)
+            if len(matches):
+                return int(ordered[matches[0]])
+
+        index = self.count
+        if index == len(self.signatures):
+            self.signatures = np.concatenate([self.signatures, np.empty_like(self.signatures)])
+        self.signatures[index] = signature
+        self.count += 1
+        self.exact[digest] = index
+        for band, key in zip(self.buckets, band_keys):
+            band[key].append(index)
+        return None
+
+    @property
+    def kept(self) -> int:
+        return self.count
+
+    def report(self, label: str = "chunks") -> dict:
+        collapsed = self.seen - self.kept
+        ratio = collapsed / self.seen if self.seen else 0.0
+        print(f"🧬 Dedup: {self.seen} → {self.kept} {label} ({collapsed} near-duplicates collapsed, {ratio:.1%})")
+        return {"input": self.seen, "kept": self.kept, "collapsed": collapsed, "ratio": round(ratio, 4)}
+
+
+def describe_source(metadata: dict) -> str:
+    """Provenance label for a chunk: plan resource name, or file (+ page)."""
+    if "resource_name" in metadata:
+        return str(metadata["resource_name"])
+    source = str(metadata.get("source", "unknown"))
+    return f"{source}#page={metadata['page']}" if "page" in metadata else source
+
+
+def add_provenance(representative, duplicate) -> None:
+    """Record that duplicate was collapsed into representative (kept in its metadata)."""
+    sources = representative.metadata.setdefault("duplicate_sources", [])
+    sources.append(describe_source(duplicate.metadata))
+    representative.metadata["duplicate_count"] = len(sources)
+    if "resource_name" in duplicate.metadata:  # plan resources the representative stands in for
+        representative.metadata.setdefault("duplicate_resources", []).append(
+            [duplicate.metadata.get("resource_type"), duplicate.metadata["resource_name"]])
+
+
+def dedup_documents(docs: List, deduper: Optional[ChunkDeduper] = None, label: str = "chunks") -> List:
+    """Collapse near-duplicate chunks, keeping the first occurrence and the provenance of every source."""
+    deduper = deduper or ChunkDeduper()
+    kept = []
+    for doc in docs:
+        representative = deduper.add(doc.page_content)
+        if representative is None:
+            kept.append(doc)
+        else:
+            add_provenance(kept[representative], doc)
+    deduper.report(label)
+    return kept
@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FINGERPRINT_LEDGER = os.getenv("FINGERPRINT_LEDGER", "output/cache/fingerprint_ledger.json")
+
+
+def canonical_json(value: Any) -> bytes:
+    """Serialize a value deterministically (sorted keys, no whitespace)."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def resource_fingerprint(res: dict) -> str:
+    """
+    Stable content hash of a resource: its type, change.actions and change.after (plans) or
+    values (states). Deletes have no after, so their change.before is hashed instead — two
+    deleted resources of one type must not share a fingerprint. after_unknown / *_sensitive
+    are deliberately left out so "known after apply" noise does not change the fingerprint.
+    """
+    change = res.get("change")
+    if not isinstance(change, dict):
+        return hashlib.sha256(canonical_json({"type": res.get("type"), "after": res.get("values")})).hexdigest()
+    body = {"type": res.get("type"), "actions": change.get("actions", []), "after": change.get("after")}
+    if body["after"] is None:
+        body["before"] = change.get("before")
+    return hashlib.sha256(canonical_json(body)).hexdigest()
+
+
+class FingerprintLedger:
+    """
+    Persistent map of stage -> {fingerprint: cached result}, stored as JSON under output/.
+    Each pipeline stage (rag, cost, html) reuses results for fingerprints it has already seen.
+    """
+
+    def __init__(self, path: str = FINGERPRINT_LEDGER):
+        self.path = Path(path)
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.stages = json.load(f).get("stages", {})
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Ignoring unreadable fingerprint ledger {self.path}: {e}")
+
+    def has(self, stage: str, fingerprint: str) -> bool:
+        return fingerprint in self.stages.get(stage, {})
+
+    def get(self, stage: str, fingerprint: str, default: Any = None) -> Any:
+        return self.stages.get(stage, {}).get(fingerprint, default)
+
+    def put(self, stage: str, fingerprint: str, result: Any) -> None:
+        self.stages.setdefault(stage, {})[fingerprint] = result
+
+    def save(self) -> None:
+        """Write the ledger atomically so concurrent readers never see a partial file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "stages": self.stages}, f)
+        os.replace(tmp, self.path)
+
+
+def violations_for_record(violations: Iterable[dict], record) -> List[dict]:
+    """Select the LLM violations that refer to a given ResourceRecord (by address or name)."""
+    matched = []
+    for v in violations:
+        if not isinstance(v, dict):
+            continue
+        if v.get("resource_name") not in (record.address, record.name):
+            continue
+        if v.get("resource_type") not in (None, record.resource_type):
+            continue
+        matched.append(v)
+    return matched
+
+
+def split_unchanged(ledger: FingerprintLedger, records: list, stage: str = "rag"):
+    """
+    Partition records into (fresh, reused_violations): fresh records have not been analyzed
+    for this fingerprint yet; reused violations are cached results rebound to the current names.
+    """
+    fresh, reused = [], []
+    for record in records:
+        if not ledger.has(stage, record.fingerprint):
+            fresh.append(record)
+            continue
+        for v in ledger.get(stage, record.fingerprint):
+            reused.append({**v, "resource_type": record.resource_type, "resource_name": record.resource_name})
+    return fresh, reused
+
+
+def prompted_resources(source_documents: Iterable) -> Set[Tuple[str, str]]:
+    """
+    (resource_type, resource_name) of the plan resources whose chunks were in the LLM prompt,
+    including near-duplicates dedup folded into a retrieved chunk.
+    """
+    prompted = set()
+    for doc in source_documents:
+        meta = getattr(doc, "metadata", None) or {}
+        if "resource_name" in meta:
+            prompted.add((meta.get("resource_type"), meta["resource_name"]))
+        prompted.update((rtype, name) for rtype, name in meta.get("duplicate_resources", []))
+    return prompted
+
+
+def record_results(ledger: FingerprintLedger, records: list, violations: list,
+                   prompted: Set[Tuple[str, str]], stage: str = "rag") -> int:
+    """
+    Store the violations found for each analyzed record (an empty list means 'clean').
+    Only records in prompted (see prompted_resources) were analyzed: the chain retrieves a
+    few chunks, and a record the LLM never saw must not be cached as clean. Returns how
+    many records were stored.
+    """
+    results = {}
+    for record in records:
+        if (record.resource_type, record.resource_name) not in prompted:
+            continue
+        # Identical resources share a fingerprint; keep whichever copy the LLM flagged
+        matched = violations_for_record(violations, record)
+        if matched or record.fingerprint not in results:
+            results[record.fingerprint] = matched
+    for fingerprint, matched in results.items():
+        ledger.put(stage, fingerprint, matched)
+    return sum((record.resource_type, record.resource_name) in prompted for record in records)
@@ -28,4 +28,10 @@ def log_llm_sources(response: dict) -> None:
         meta = doc.metadata or {}
         print(f"🔹 [{i}] {meta.get('resource_name', 'Unnamed')} ({meta.get('resource_type', 'Unknown')})")
         print(f"    └─ Source: {meta.get('source', 'N/A')}")
-        print(f"    └─ Standard: {meta.get('standard', 'Unlabeled')}\n")
+        print(f"    └─ Standard: {meta.get('standard', 'Unlabeled')}")
+        if "tier" in meta:
+            print(f"    └─ Tier: {meta['tier']} (score {meta['score']:.2f})")
+        if meta.get("duplicate_count"):
+            print(f"    └─ Also covers {meta['duplicate_count']} near-duplicates: "
+                  f"{', '.join(meta['duplicate_sources'][:5])}")
+        print()
@@ -28,6 +28,7 @@ def validate_and_write_output(response: dict, plan_path: str, output_path: str):
         with open(output_path, "w") as f:
             json.dump(parsed, f, indent=2)
         print(f"✅ Parsed and saved structured output to: {output_path}")
+        return parsed
     except Exception as e:
         print(f"❌ Failed to parse or validate JSON: {e}")
         fallback = Path(output_path).with_suffix(".raw.txt")
@@ -43,4 +44,38 @@ def validate_and_write_output(response: dict, plan_path: str, output_path: str):
         with open(output_path, "w") as f:
             json.dump(fallback_json, f, indent=2)
         print(f"📝 Fallback empty compliance JSON written to: {output_path}")
+        return None
 
+
+def load_compliance_output(output_path: str) -> dict:
+    """Read a previously written compliance JSON, normalized to {violations, recommendations}."""
+    try:
+        with open(output_path, "r") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        data = {}
+    if not isinstance(data, dict):
+        data = {"violations": data if isinstance(data, list) else []}
+    data.setdefault("violations", [])
+    data.setdefault("recommendations", [])
+    return data
+
+
+def merge_violations_into_output(output_path: str, extra_violations: list, recommendations: list = None,
+                                 reset_violations: bool = False) -> dict:
+    """
+    Append previously computed violations to the compliance JSON at output_path.
+    With reset_violations=True the existing violations are replaced (recommendations are kept).
+    """
+    merged = load_compliance_output(output_path)
+    if reset_violations:
+        merged["violations"] = []
+    merged["violations"].extend(extra_violations)
+    for rec in recommendations or []:
+        if rec not in merged["recommendations"]:
+            merged["recommendations"].append(rec)
+
+    with open(output_path, "w") as f:
+        json.dump(merged, f, indent=2)
+    print(f"🔗 Merged {len(extra_violations)} reused violations into: {output_path}")
+    return merged
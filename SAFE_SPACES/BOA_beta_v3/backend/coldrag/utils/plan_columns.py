@@ -0,0 +1,212 @@
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from backend.coldrag.utils.resource_record import ResourceRecord
+
+load_dotenv()
+
+COLUMN_CACHE = os.getenv("COLUMN_CACHE", "true").lower() == "true"
+COLUMN_CACHE_SUFFIX = ".cols"
+COLUMN_CACHE_VERSION = 2
+
+# Dictionary-encoded string columns: int32 codes + vocabulary in meta.json
+CATEGORICAL = ("resource_type", "module_address", "action", "provider", "kind")
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Content hash of the source JSON, used to invalidate the column cache."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def column_dir_for(json_path: str) -> Path:
+    """cmmc_tfplan.json -> cmmc_tfplan.cols/ (next to the source)."""
+    return Path(json_path).with_suffix(COLUMN_CACHE_SUFFIX)
+
+
+def _write_strings(directory: Path, name: str, values: List[str]) -> None:
+    """Variable-length strings as one UTF-8 blob plus an int64 offsets array."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    with open(directory / f"{name}.bin", "wb") as f:
+        for b in encoded:
+            f.write(b)
+    np.save(directory / f"{name}.offsets.npy", offsets)
+
+
+def write_plan_columns(records: List[ResourceRecord], json_path: str, costs: Optional[Iterable[float]] = None,
+                       source_hash: Optional[str] = None) -> Path:
+    """
+    Persist the resource table of a parsed plan as memory-mappable columns:
+    address, name, type, module, action, provider, kind, fingerprint, cost and the
+    offset/length of each resource's compact JSON in after.bin.
+    """
+    target = column_dir_for(json_path)
+    tmp = target.with_suffix(".cols.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    meta = {"version": COLUMN_CACHE_VERSION, "rows": len(records),
+            "source_hash": source_hash or file_sha256(json_path), "vocab": {}}
+    for column in CATEGORICAL:
+        vocab: Dict[str, int] = {}
+        codes = np.fromiter((vocab.setdefault(getattr(r, column), len(vocab)) for r in records),
+                            dtype=np.int32, count=len(records))
+        np.save(tmp / f"{column}.npy", codes)
+        meta["vocab"][column] = list(vocab)
+
+    _write_strings(tmp, "address", [r.address for r in records])
+    _write_strings(tmp, "name", [r.name for r in records])
+    np.save(tmp / "fingerprint.npy", np.array([r.fingerprint for r in records], dtype="S64"))
+
+    cost_values = list(costs) if costs is not None else [np.nan] * len(records)
+    np.save(tmp / "cost.npy", np.asarray(cost_values, dtype=np.float64))
+
+    # Resource bodies back to back; a row's JSON is after.bin[offset:offset+length]
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    with open(tmp / "after.bin", "wb") as f:
+        for i, r in enumerate(records):
+            f.write(r.payload)
+            offsets[i + 1] = offsets[i] + len(r.payload)
+    np.save(tmp / "after.offsets.npy", offsets)
+
+    with open(tmp / "meta.json", "w") as f:
+        json.dump(meta, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+def write_cost_column(json_path: str, costs: Iterable[float]) -> None:
+    """Replace only the cost column of an existing cache (e.g. after a pricing run)."""
+    directory = column_dir_for(json_path)
+    tmp = directory / "cost.tmp.npy"
+    np.save(tmp, np.asarray(list(costs), dtype=np.float64))
+    os.replace(tmp, directory / "cost.npy")
+
+
+class PlanColumns:
+    """
+    Read-only, memory-mapped view of a plan's resource table. Filters and aggregates
+    run as numpy operations over the code columns; strings and JSON bodies are only
+    decoded for the rows actually returned.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json") as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self.vocab = self.meta["vocab"]
+        self.codes = {c: np.load(self.directory / f"{c}.npy", mmap_mode="r") for c in CATEGORICAL}
+        self.fingerprint = np.load(self.directory / "fingerprint.npy", mmap_mode="r")
+        self.cost = np.load(self.directory / "cost.npy", mmap_mode="r")
+        self._strings = {
+            name: (np.memmap(self.directory / f"{name}.bin", dtype=np.uint8, mode="r") if self._nonempty(name) else b"",
+                   np.load(self.directory / f"{name}.offsets.npy", mmap_mode="r"))
+            for name in ("address", "name", "after")
+        }
+
+    def _nonempty(self, name: str) -> bool:
+        return (self.directory / f"{name}.bin").stat().st_size > 0
+
+    @classmethod
+    def open(cls, json_path: str, verify: bool = True) -> Optional["PlanColumns"]:
+        """Open the cache for json_path, or None if missing or stale (source hash changed)."""
+        directory = column_dir_for(json_path)
+        if not (directory / "meta.json").exists():
+            return None
+        columns = cls(directory)
+        if columns.meta.get("version") != COLUMN_CACHE_VERSION:
+            return None
+        if verify and columns.meta.get("source_hash") != file_sha256(json_path):
+            return None
+        return columns
+
+    def __len__(self) -> int:
+        return self.rows
+
+    # --- Row access ----------------------------------------------------
+
+    def _string(self, name: str, i: int) -> str:
+        blob, offsets = self._strings[name]
+        return bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def address(self, i: int) -> str:
+        return self._string("address", i)
+
+    def resource(self, i: int) -> dict:
+        """Decode one resource body on demand."""
+        return json.loads(self._string("after", i))
+
+    def value(self, column: str, i: int) -> str:
+        return self.vocab[column][int(self.codes[column][i])]
+
+    def row(self, i: int) -> dict:
+        cost = float(self.cost[i])
+        return {
+            "address": self.address(i),
+            "name": self._string("name", i),
+            **{column: self.value(column, i) for column in CATEGORICAL},
+            "fingerprint": self.fingerprint[i].decode("ascii"),
+            "cost": None if np.isnan(cost) else cost,
+        }
+
+    # --- Vectorized queries ---------------------------------------------
+
+    def mask(self, **filters) -> np.ndarray:
+        """Boolean row mask for equality filters on categorical columns, e.g. mask(action="create")."""
+        result = np.ones(self.rows, dtype=bool)
+        for column, wanted in filters.items():
+            if wanted is None:
+                continue
+            vocab = self.vocab[column]
+            if wanted not in vocab:
+                return np.zeros(self.rows, dtype=bool)
+            result &= np.asarray(self.codes[column]) == vocab.index(wanted)
+        return result
+
+    def select(self, **filters) -> np.ndarray:
+        """Row indices matching the filters."""
+        return np.flatnonzero(self.mask(**filters))
+
+    def counts(self, column: str, **filters) -> Dict[str, int]:
+        """Group-by count over a categorical column, e.g. counts("resource_type", action="create")."""
+        codes = np.asarray(self.codes[column])[self.mask(**filters)]
+        totals = np.bincount(codes, minlength=len(self.vocab[column]))
+        return {value: int(n) for value, n in zip(self.vocab[column], totals) if n}
+
+    def cost_by(self, column: str, **filters) -> Dict[str, float]:
+        """Group-by sum of the cost column (rows without a cached cost are skipped)."""
+        keep = self.mask(**filters) & ~np.isnan(np.asarray(self.cost))
+        codes = np.asarray(self.codes[column])[keep]
+        totals = np.bincount(codes, weights=np.asarray(self.cost)[keep], minlength=len(self.vocab[column]))
+        return {value: float(t) for value, t in zip(self.vocab[column], totals) if t}
+
+    def to_records(self, indices: Optional[Iterable[int]] = None) -> List[ResourceRecord]:
+        """Rebuild ResourceRecords (e.g. for TerraformPlan) without touching the source JSON."""
+        indices = range(self.rows) if indices is None else indices
+        records = []
+        for i in indices:
+            blob, offsets = self._strings["after"]
+            records.append(ResourceRecord(
+                kind=self.value("kind", i),
+                resource_type=self.value("resource_type", i),
+                address=self.address(i),
+                name=self._string("name", i),
+                provider=self.value("provider", i),
+                module_address=self.value("module_address", i),
+                action=self.value("action", i),
+                fingerprint=self.fingerprint[i].decode("ascii"),
+                payload=bytes(blob[offsets[i]:offsets[i + 1]]),
+            ))
+        return records
@@ -0,0 +1,162 @@
+from typing import Any, Dict, Iterable, List, Sequence
+from backend.coldrag.utils.fingerprints import resource_fingerprint
+from backend.coldrag.utils.plan_parser import iter_state_resources
+from backend.coldrag.utils.resource_record import ResourceRecord
+
+_MISSING = object()
+
+
+def index_resources(data: dict) -> Dict[str, dict]:
+    """Map resource address -> resource for a plan (resource_changes) or state (all modules, raw or shown)."""
+    resources = data.get("resource_changes")
+    if resources is None:
+        resources = [res for _, res in iter_state_resources(data)]
+    return {res.get("address", res.get("name", "unknown")): res for res in resources}
+
+
+def resource_body(res: dict) -> Any:
+    """The attribute block compared between plans: change.after for plans, values for states."""
+    change = res.get("change")
+    return change.get("after") if isinstance(change, dict) else res.get("values")
+
+
+def resource_actions(res: dict) -> List[str]:
+    change = res.get("change")
+    return change.get("actions", []) if isinstance(change, dict) else []
+
+
+def flatten_attributes(value: Any, prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested dicts/lists into {"a.b[0].c": leaf} pairs."""
+    flat = {}
+    if isinstance(value, dict):
+        if not value and prefix:
+            flat[prefix] = value
+        for key, sub in value.items():
+            flat.update(flatten_attributes(sub, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        if not value and prefix:
+            flat[prefix] = value
+        for i, sub in enumerate(value):
+            flat.update(flatten_attributes(sub, f"{prefix}[{i}]"))
+    else:
+        flat[prefix] = value
+    return flat
+
+
+def attribute_changes(before: Any, after: Any) -> Dict[str, dict]:
+    """Attribute-level diff of two resource bodies: {path: {"before": old, "after": new}}."""
+    old_flat = flatten_attributes(before or {})
+    new_flat = flatten_attributes(after or {})
+    changes = {}
+    for path in old_flat.keys() | new_flat.keys():
+        old = old_flat.get(path, _MISSING)
+        new = new_flat.get(path, _MISSING)
+        if old != new:
+            changes[path] = {
+                "before": None if old is _MISSING else old,
+                "after": None if new is _MISSING else new,
+            }
+    return dict(sorted(changes.items()))
+
+
+class PlanDelta:
+    """Resources added, removed or changed between two plans, keyed by address."""
+
+    def __init__(self, added: Dict[str, dict], removed: Dict[str, dict], changed: Dict[str, dict]):
+        self.added = added
+        self.removed = removed
+        # address -> {"resource": new resource, "attributes": {path: {"before", "after"}}}
+        self.changed = changed
+
+    @property
+    def touched(self) -> set:
+        """Addresses whose previous analysis is no longer valid."""
+        return set(self.added) | set(self.removed) | set(self.changed)
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return f"+{len(self.added)} added, -{len(self.removed)} removed, ~{len(self.changed)} changed"
+
+    def to_dict(self) -> dict:
+        return {
+            "added": sorted(self.added),
+            "removed": sorted(self.removed),
+            "changed": {address: entry["attributes"] for address, entry in sorted(self.changed.items())},
+        }
+
+
+def _changed_entry(prev: dict, res: dict) -> dict:
+    """Attribute diff of two versions of a resource, plus the actions when they differ."""
+    attributes = attribute_changes(resource_body(prev), resource_body(res))
+    if resource_actions(prev) != resource_actions(res):
+        attributes["change.actions"] = {"before": resource_actions(prev), "after": resource_actions(res)}
+    return {"resource": res, "attributes": attributes}
+
+
+def diff_plans(old: dict, new: dict) -> PlanDelta:
+    """
+    Compare two plan (or state) JSONs in O(n): resources are matched by address and
+    compared by content fingerprint; attribute diffs are only computed for mismatches.
+    """
+    old_index = index_resources(old)
+    new_index = index_resources(new)
+
+    added, changed = {}, {}
+    for address, res in new_index.items():
+        prev = old_index.get(address)
+        if prev is None:
+            added[address] = res
+        elif resource_fingerprint(prev) != resource_fingerprint(res):
+            changed[address] = _changed_entry(prev, res)
+
+    removed = {address: res for address, res in old_index.items() if address not in new_index}
+    return PlanDelta(added, removed, changed)
+
+
+def diff_records(old_records: Sequence[ResourceRecord], new_records: Sequence[ResourceRecord]) -> PlanDelta:
+    """
+    Same delta as diff_plans, from already-parsed records: the stored fingerprints are
+    compared directly and only mismatched (or added/removed) resources are decoded.
+    """
+    old_index = {r.address: r for r in old_records}
+    new_addresses = {r.address for r in new_records}
+
+    added, changed = {}, {}
+    for record in new_records:
+        prev = old_index.get(record.address)
+        if prev is None:
+            added[record.address] = record.resource
+        elif prev.fingerprint != record.fingerprint:
+            changed[record.address] = _changed_entry(prev.resource, record.resource)
+
+    removed = {r.address: r.resource for r in old_records if r.address not in new_addresses}
+    return PlanDelta(added, removed, changed)
+
+
+def load_plan_delta(old_path: str, new_path: str) -> PlanDelta:
+    """Diff two plan JSON files on disk, through their cached TerraformPlan models."""
+    from backend.coldrag.utils.plan_model import TerraformPlan  # plan_model -> plan_index -> plan_delta
+    return diff_records(TerraformPlan.load(old_path).records, TerraformPlan.load(new_path).records)
+
+
+def carry_forward_violations(previous_violations: Iterable[dict], delta: PlanDelta) -> List[dict]:
+    """
+    Keep earlier findings for resources the delta did not touch. Findings are matched by
+    full address, or by (resource_type, name) when they only carry the short name — never
+    by the name alone, which other resource types may share (aws_s3_bucket.main vs aws_kms_key.main).
+    """
+    touched = delta.touched
+    touched_resources = list(delta.added.values()) + list(delta.removed.values()) + \
+        [entry["resource"] for entry in delta.changed.values()]
+    touched_pairs = {(res.get("type"), res.get("name")) for res in touched_resources}
+    kept = []
+    for v in previous_violations:
+        if not isinstance(v, dict):
+            continue
+        name = v.get("resource_name")
+        if name in touched or (v.get("resource_type"), name) in touched_pairs:
+            continue
+        kept.append(v)
+    return kept
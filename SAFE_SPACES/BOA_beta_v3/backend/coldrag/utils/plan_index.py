@@ -0,0 +1,113 @@
+import json
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+from backend.coldrag.utils.plan_delta import resource_actions, resource_body
+from backend.coldrag.utils.resource_record import classify_action
+
+
+def iter_attribute_paths(value: Any, prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (path, value) for every attribute under a resource body. List indices are
+    collapsed ("ingress.cidr_blocks"), nulls and empty blocks count as absent, and
+    every intermediate block path is yielded with value None.
+    """
+    if isinstance(value, dict):
+        if value and prefix:
+            yield prefix, None
+        for key, sub in value.items():
+            yield from iter_attribute_paths(sub, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_attribute_paths(item, prefix)
+    elif value is not None and prefix:
+        yield prefix, value
+
+
+def parse_query_value(raw: str) -> Any:
+    """Interpret a query value the way it appears in plan JSON ("true" -> True, "443" -> 443)."""
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return raw
+
+
+def _value_key(path: str, value: Any) -> Tuple[str, str, Any]:
+    return path, type(value).__name__, value
+
+
+class PlanIndex:
+    """
+    Inverted indexes over change.after (plans) / values (states), built in one pass:
+    path -> addresses, (path, value) -> addresses, type -> addresses. Values are keyed
+    with their type name, so True/1 and False/0 (equal and same-hash in Python) stay apart.
+    """
+
+    def __init__(self):
+        self.by_path: Dict[str, Set[str]] = defaultdict(set)
+        self.by_value: Dict[Tuple[str, str, Any], Set[str]] = defaultdict(set)
+        self.by_type: Dict[str, Set[str]] = defaultdict(set)
+        self.types: Dict[str, str] = {}
+        # Planned deletes have no change.after; kept out of missing() so they don't match every path
+        self.deleted: Set[str] = set()
+
+    def add(self, address: str, resource_type: str, body: Any, action: str = "") -> None:
+        self.by_type[resource_type].add(address)
+        self.types[address] = resource_type
+        if action == "delete":
+            self.deleted.add(address)
+        for path, value in iter_attribute_paths(body):
+            self.by_path[path].add(address)
+            if value is not None:
+                self.by_value[_value_key(path, value)].add(address)
+
+    @classmethod
+    def from_resources(cls, resources: Iterable[dict]) -> "PlanIndex":
+        index = cls()
+        for res in resources:
+            index.add(res.get("address", res.get("name", "unknown")), res.get("type", "unknown"), resource_body(res),
+                      classify_action(resource_actions(res)))
+        return index
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> "PlanIndex":
+        """Build from ResourceRecords (each payload is decoded exactly once)."""
+        index = cls()
+        for record in records:
+            index.add(record.address, record.resource_type, resource_body(record.resource), record.action)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def with_path(self, path: str, resource_type: Optional[str] = None) -> Set[str]:
+        """Resources that set the attribute/block at path."""
+        found = self.by_path.get(path, set())
+        return found & self.by_type.get(resource_type, set()) if resource_type else set(found)
+
+    def with_value(self, path: str, value: Any, resource_type: Optional[str] = None) -> Set[str]:
+        """Resources where path equals value (or a list at path contains it)."""
+        found = self.by_value.get(_value_key(path, value), set())
+        return found & self.by_type.get(resource_type, set()) if resource_type else set(found)
+
+    def missing(self, path: str, resource_type: Optional[str] = None) -> Set[str]:
+        """Resources (optionally of one type) where path is absent, null or empty; planned deletes excluded."""
+        candidates = self.by_type.get(resource_type, set()) if resource_type else set(self.types)
+        return candidates - self.by_path.get(path, set()) - self.deleted
+
+    def of_type(self, resource_type: str) -> Set[str]:
+        return set(self.by_type.get(resource_type, set()))
+
+    def query(self, path: str, value: Optional[str] = None, missing: bool = False,
+              resource_type: Optional[str] = None) -> Set[str]:
+        """String-friendly entry point shared by the CLI tools and the API."""
+        if missing:
+            return self.missing(path, resource_type)
+        if value is not None:
+            return self.with_value(path, parse_query_value(value), resource_type)
+        return self.with_path(path, resource_type)
+
+
+def load_plan_index(json_path: str) -> PlanIndex:
+    """Index a plan/state JSON through its cached TerraformPlan model (parsed only on a cache miss)."""
+    from backend.coldrag.utils.plan_model import TerraformPlan  # plan_model imports this module
+    return TerraformPlan.load(json_path).index
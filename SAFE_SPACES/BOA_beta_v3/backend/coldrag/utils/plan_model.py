@@ -0,0 +1,159 @@
+import os
+import pickle
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from backend.coldrag.utils.plan_parser import load_terraform_records, extract_records_from_plan, extract_records_from_state
+from backend.coldrag.utils.resource_record import ResourceRecord, ACTION_ORDER
+from backend.coldrag.utils.plan_index import PlanIndex
+from backend.coldrag.utils.plan_columns import (
+    COLUMN_CACHE, PlanColumns, write_plan_columns, write_cost_column
+)
+
+load_dotenv()
+
+PLAN_MODEL_CACHE = os.getenv("PLAN_MODEL_CACHE", "true").lower() == "true"
+MODEL_CACHE_SUFFIX = ".model.pkl"
+MODEL_CACHE_VERSION = 3
+
+ACTIONS = ACTION_ORDER + ("other",)
+
+
+def _source_stamp(path: Path) -> tuple:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+class TerraformPlan:
+    """
+    A plan (or state) decoded once and shared by the RAG inspector, cost estimator and
+    HTML report. Action buckets, per-type counts, per-module groupings and address
+    lookups are precomputed; the whole object can be pickled next to the source JSON.
+    """
+
+    def __init__(self, records: List[ResourceRecord], source: Optional[str] = None):
+        self.records = records
+        self.source = source
+        self.stamp: Optional[tuple] = None  # (size, mtime) of source when the records were read
+        self.by_address: Dict[str, int] = {}
+        self.buckets: Dict[str, List[int]] = {action: [] for action in ACTIONS}
+        self.modules: Dict[str, List[int]] = defaultdict(list)
+        self.type_counts: Counter = Counter()
+
+        for i, record in enumerate(records):
+            self.by_address[record.address] = i
+            self.buckets[record.action].append(i)
+            self.modules[record.module_address].append(i)
+            self.type_counts[record.resource_type] += 1
+        self.modules = dict(self.modules)
+        self._index = None
+
+    # --- Construction -------------------------------------------------
+
+    @classmethod
+    def from_data(cls, data: dict) -> "TerraformPlan":
+        """Wrap an already decoded plan/state dict (no second json.load)."""
+        if data.get("resource_changes"):
+            return cls(extract_records_from_plan(data))
+        return cls(extract_records_from_state(data))
+
+    @classmethod
+    def load(cls, json_path: str, use_cache: bool = PLAN_MODEL_CACHE) -> "TerraformPlan":
+        """
+        Load a plan JSON, reusing the pickled model written by an earlier pipeline stage
+        when the source file is unchanged.
+        """
+        source = Path(json_path)
+        cache_path = source.with_suffix(MODEL_CACHE_SUFFIX)
+        stamp = _source_stamp(source)
+        if use_cache and cache_path.exists():
+            plan = cls.read_cache(cache_path, expected_stamp=stamp)
+            if plan is not None:
+                print(f"⚡ Reusing parsed plan model: {cache_path}")
+                return plan
+
+        # The columnar cache is keyed by content hash, so it survives touch/copy of the JSON
+        columns = PlanColumns.open(str(source)) if COLUMN_CACHE else None
+        if columns is not None:
+            print(f"⚡ Rebuilding plan model from column cache: {columns.directory}")
+            plan = cls(columns.to_records(), source=str(source))
+        else:
+            plan = cls(list(load_terraform_records(str(source))), source=str(source))
+            if COLUMN_CACHE:
+                write_plan_columns(plan.records, str(source))
+        plan.stamp = stamp
+        if use_cache:
+            plan.write_cache(cache_path, stamp)
+        return plan
+
+    # --- Persistence ---------------------------------------------------
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_index"] = None  # rebuilt lazily, not worth persisting
+        return state
+
+    def write_cache(self, cache_path: Path, stamp: tuple) -> None:
+        tmp = cache_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((MODEL_CACHE_VERSION, stamp, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+
+    @classmethod
+    def read_cache(cls, cache_path: Path, expected_stamp: tuple) -> Optional["TerraformPlan"]:
+        try:
+            with open(cache_path, "rb") as f:
+                version, stamp, plan = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable plan model cache {cache_path}: {e}")
+            return None
+        if version != MODEL_CACHE_VERSION or tuple(stamp) != tuple(expected_stamp):
+            return None
+        return plan
+
+    # --- Views ---------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def get(self, address: str) -> Optional[ResourceRecord]:
+        i = self.by_address.get(address)
+        return None if i is None else self.records[i]
+
+    def bucket(self, action: str) -> List[ResourceRecord]:
+        return [self.records[i] for i in self.buckets.get(action, [])]
+
+    def module(self, module_address: str) -> List[ResourceRecord]:
+        return [self.records[i] for i in self.modules.get(module_address, [])]
+
+    def action_counts(self) -> Dict[str, int]:
+        return {action: len(indices) for action, indices in self.buckets.items()}
+
+    def columns(self) -> Optional[PlanColumns]:
+        """Memory-mapped columnar view of this plan (None if there is no cache for the current source)."""
+        return PlanColumns.open(self.source) if self.source else None
+
+    def store_costs(self, costs: List[float]) -> None:
+        """
+        Persist per-record costs (aligned with self.records) into the column cache. Only the
+        cost column is replaced when the cache belongs to the current source; a missing or
+        stale cache is rewritten only while the source is still the file these records came from.
+        """
+        if not (self.source and COLUMN_CACHE):
+            return
+        columns = self.columns()
+        if columns is not None and len(columns) == len(self.records):
+            write_cost_column(self.source, costs)
+        elif self.stamp is not None and tuple(self.stamp) == _source_stamp(Path(self.source)):
+            write_plan_columns(self.records, self.source, costs=costs)
+
+    @property
+    def index(self) -> PlanIndex:
+        """Attribute-path PlanIndex over the same records, built on first use."""
+        if self._index is None:
+            self._index = PlanIndex.from_records(self.records)
+        return self._index
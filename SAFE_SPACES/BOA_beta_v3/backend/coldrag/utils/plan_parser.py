@@ -1,7 +1,39 @@
+import os
+import re
 import json
 from pathlib import Path
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from dotenv import load_dotenv
 from langchain.schema import Document
+from backend.coldrag.utils.resource_record import ResourceRecord, records_to_documents
+
+load_dotenv()
+
+PLAN_STREAMING = os.getenv("PLAN_STREAMING", "false").lower() == "true"
+SERIALIZE_WORKERS = int(os.getenv("SERIALIZE_WORKERS", 0)) or os.cpu_count() or 1
+PARALLEL_SERIALIZE_THRESHOLD = int(os.getenv("PARALLEL_SERIALIZE_THRESHOLD", 10000))
+
+# ijson prefixes of the resources we care about; everything else (prior_state,
+# planned_values, configuration, ...) is tokenized by the streaming reader but never built
+PLAN_STREAM_PREFIX = "resource_changes.item"
+STATE_STREAM_PREFIX = re.compile(r"^values\.root_module(\.child_modules\.item)*\.resources\.item$")
+# Native terraform.tfstate (v4): top-level resources[], each with instances[]
+RAW_STATE_STREAM_PREFIX = "resources.item"
+
+# module.x.provider["registry.terraform.io/hashicorp/aws"].alias -> registry.terraform.io/hashicorp/aws
+RAW_PROVIDER = re.compile(r'provider\["([^"]+)"\]')
+
+
+def stream_kind(prefix: str) -> Optional[str]:
+    """Classify an ijson prefix as a plan resource, a (nested) state resource, or neither."""
+    if prefix == PLAN_STREAM_PREFIX:
+        return "plan"
+    if prefix.startswith("values.root_module") and STATE_STREAM_PREFIX.match(prefix):
+        return "state"
+    if prefix == RAW_STATE_STREAM_PREFIX:
+        return "raw_state"
+    return None
 
 
 def load_json_file(path: str) -> dict:
@@ -10,60 +42,187 @@ def load_json_file(path: str) -> dict:
         return json.load(f)
 
 
+def iter_module_resources(root_module: dict) -> Iterator[Tuple[str, dict]]:
+    """
+    Walk a state/planned_values module tree (root_module + child_modules at any depth)
+    without recursion, yielding (module_address, resource) in a stable pre-order.
+    """
+    stack = [root_module]
+    while stack:
+        module = stack.pop()
+        module_address = module.get("address", "")
+        for res in module.get("resources", []):
+            yield module_address, res
+        stack.extend(reversed(module.get("child_modules", [])))
+
+
+def is_raw_state(data: dict) -> bool:
+    """True for a native terraform.tfstate (version 4 resources[].instances[] layout)."""
+    return isinstance(data.get("resources"), list) and "values" not in data and "resource_changes" not in data
+
+
+def raw_instance_address(module: str, mode: str, r_type: str, name: str, index_key=None) -> str:
+    """Build the address `terraform show -json` would print, e.g. module.a.aws_instance.web["blue"]."""
+    address = f"data.{r_type}.{name}" if mode == "data" else f"{r_type}.{name}"
+    if index_key is not None:
+        address += f"[{json.dumps(index_key)}]"
+    return f"{module}.{address}" if module else address
+
+
+def expand_raw_state_resource(res: dict) -> Iterator[Tuple[str, dict]]:
+    """
+    Expand one raw state resource (count/for_each instances included) into
+    (module_address, resource) pairs shaped like `terraform show -json` state resources.
+    """
+    module = res.get("module", "")
+    mode = res.get("mode", "managed")
+    r_type = res.get("type", "unknown")
+    name = res.get("name", "unknown")
+    provider = RAW_PROVIDER.search(res.get("provider", ""))
+    for instance in res.get("instances", []):
+        index_key = instance.get("index_key")
+        resource = {
+            "address": raw_instance_address(module, mode, r_type, name, index_key),
+            "mode": mode,
+            "type": r_type,
+            "name": name,
+            "provider_name": provider.group(1) if provider else res.get("provider", "unknown"),
+            "schema_version": instance.get("schema_version", 0),
+            "values": instance.get("attributes") or {},
+        }
+        if index_key is not None:
+            resource["index"] = index_key
+        if instance.get("status") == "tainted":
+            resource["tainted"] = True
+        if instance.get("deposed"):
+            resource["deposed_key"] = instance["deposed"]
+        if instance.get("dependencies"):
+            resource["depends_on"] = instance["dependencies"]
+        yield module, resource
+
+
+def iter_state_resources(data: dict) -> Iterator[Tuple[str, dict]]:
+    """(module_address, resource) for either a `terraform show -json` state or a raw tfstate."""
+    if is_raw_state(data):
+        for res in data["resources"]:
+            yield from expand_raw_state_resource(res)
+    else:
+        yield from iter_module_resources(data.get("values", {}).get("root_module", {}))
+
+
+def _build_record(item: Tuple[str, dict, str]) -> ResourceRecord:
+    kind, res, module_address = item
+    return ResourceRecord.from_resource(res, kind, module_address=module_address)
+
+
+def build_records(items: Iterable[Tuple[str, dict, str]], workers: int = SERIALIZE_WORKERS) -> List[ResourceRecord]:
+    """
+    Serialize (kind, resource, module_address) items into ResourceRecords.
+    Large inputs are spread across a process pool; map() keeps the output in input order.
+    """
+    items = list(items)
+    if workers <= 1 or len(items) < PARALLEL_SERIALIZE_THRESHOLD:
+        return [_build_record(item) for item in items]
+
+    print(f"⚙️ Serializing {len(items)} resources across {workers} processes...")
+    chunksize = max(1, len(items) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_build_record, items, chunksize=chunksize))
+
+
+def extract_records_from_plan(data: dict) -> List[ResourceRecord]:
+    """Extract compact ResourceRecords from a Terraform plan JSON (resource_changes)."""
+    return build_records(("plan", change, None) for change in data.get("resource_changes", []))
+
+
+def extract_records_from_state(data: dict) -> List[ResourceRecord]:
+    """Extract compact ResourceRecords from a Terraform state (show -json or raw tfstate v4)."""
+    return build_records(("state", res, module_address) for module_address, res in iter_state_resources(data))
+
+
 def extract_documents_from_plan(data: dict) -> List[Document]:
     """Extract Document objects from a Terraform plan JSON (resource_changes)."""
-    docs = []
-    changes = data.get("resource_changes", [])
-    for change in changes:
-        resource_type = change.get("type", "unknown")
-        resource_name = change.get("address", "unknown")
-        docs.append(Document(
-            page_content=json.dumps(change, indent=2),
-            metadata={
-                "resource_type": resource_type,
-                "resource_name": resource_name,
-                "standard": resource_type.upper(),
-                "source": resource_name.upper()
-            }
-        ))
-    return docs
+    return records_to_documents(extract_records_from_plan(data))
 
 
 def extract_documents_from_state(data: dict) -> List[Document]:
-    """Extract Document objects from a Terraform state JSON (root_module.resources)."""
-    docs = []
-    resources = data.get("values", {}).get("root_module", {}).get("resources", [])
-    for res in resources:
-        resource_type = res.get("type", "unknown")
-        resource_name = res.get("name", "unknown")
-        docs.append(Document(
-            page_content=json.dumps(res, indent=2),
-            metadata={
-                "resource_type": resource_type,
-                "resource_name": resource_name,
-                "standard": resource_type.upper(),
-                "source": resource_name.upper()
-            }
-        ))
-    return docs
-
-
-def load_terraform_docs(json_path: str) -> List[Document]:
+    """Extract Document objects from a Terraform state (show -json or raw tfstate v4)."""
+    return records_to_documents(extract_records_from_state(data))
+
+
+def iter_resources_streaming(json_path: str) -> Iterator[Tuple[str, dict]]:
     """
-    Load Terraform resources from either plan or state JSON into Document format.
+    Incrementally read a plan or state JSON and yield (kind, resource) pairs one at a time.
+    Only the resource currently being built is held in memory. Raw tfstate resources are
+    expanded into one state resource per instance.
+    """
+    import ijson
+
+    with open(json_path, "rb") as f:
+        builder, target, kind = None, None, None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == target and event == "end_map":
+                    if kind == "raw_state":
+                        for _, res in expand_raw_state_resource(builder.value):
+                            yield "state", res
+                    else:
+                        yield kind, builder.value
+                    builder = None
+            elif event == "start_map" and stream_kind(prefix):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                target, kind = prefix, stream_kind(prefix)
+
+
+def iter_terraform_records(json_path: str) -> Iterator[ResourceRecord]:
+    """Stream Terraform resources from a plan or state JSON as ResourceRecords."""
+    found = False
+    for kind, res in iter_resources_streaming(json_path):
+        found = True
+        yield ResourceRecord.from_resource(res, kind)
+
+    if not found:
+        raise ValueError(f"❌ Unsupported or unrecognized Terraform JSON format: {json_path}")
+
+
+def load_terraform_records(json_path: str, stream: bool = PLAN_STREAMING) -> Union[List[ResourceRecord], Iterator[ResourceRecord]]:
+    """
+    Load Terraform resources from either plan or state JSON as compact ResourceRecords.
+    With stream=True, returns a generator that reads the file incrementally instead of
+    decoding the whole plan up front.
     """
     input_path = Path(json_path)
     if not input_path.exists() or input_path.stat().st_size == 0:
         raise ValueError(f"⚠️ Input file {input_path} is missing or empty.")
 
+    if stream:
+        print("📐 Streaming Terraform resources (resource_changes / values.root_module.resources / resources)...")
+        return iter_terraform_records(str(input_path))
+
     data = load_json_file(str(input_path))
 
     # Prefer resource_changes (plan) if available, else fallback to state format
     if data.get("resource_changes"):
         print("📐 Parsing Terraform plan (resource_changes)...")
-        return extract_documents_from_plan(data)
+        return extract_records_from_plan(data)
     elif data.get("values"):
-        print("📐 Parsing Terraform state (values.root_module.resources)...")
-        return extract_documents_from_state(data)
+        print("📐 Parsing Terraform state (values.root_module + child_modules)...")
+        return extract_records_from_state(data)
+    elif is_raw_state(data) and data["resources"]:
+        print(f"📐 Parsing raw Terraform state v{data.get('version', '?')} (resources[].instances[])...")
+        return extract_records_from_state(data)
     else:
         raise ValueError(f"❌ Unsupported or unrecognized Terraform JSON format: {json_path}")
+
+
+def load_terraform_docs(json_path: str, stream: bool = PLAN_STREAMING) -> Union[List[Document], Iterator[Document]]:
+    """
+    Load Terraform resources from either plan or state JSON into Document format.
+    Prefer load_terraform_records for large plans and convert at embedding time.
+    """
+    records = load_terraform_records(json_path, stream=stream)
+    if stream:
+        return (record.to_document() for record in records)
+    return records_to_documents(records)
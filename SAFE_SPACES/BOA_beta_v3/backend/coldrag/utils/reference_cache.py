@@ -0,0 +1,123 @@
+import os
+import gzip
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from langchain.schema import Document
+
+load_dotenv()
+
+REF_TEXT_CACHE = os.getenv("REF_TEXT_CACHE", "true").lower() == "true"
+REF_TEXT_CACHE_DIR = os.getenv("REF_TEXT_CACHE_DIR", "output/cache/reference_text")
+REF_TEXT_CACHE_VERSION = 1
+
+
+def content_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReferenceTextCache:
+    """
+    Extracted page text + metadata of reference files, one gzip JSON entry per file.
+    Entries are keyed by (path, size, mtime, content hash): a matching size/mtime is
+    trusted as is, a changed mtime with the same content hash is refreshed in place.
+    """
+
+    def __init__(self, cache_dir: str = REF_TEXT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.manifest_path = self.cache_dir / "manifest.json"
+        self.hits = 0
+        self.misses = 0
+        self.entries: Dict[str, dict] = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path) as f:
+                    manifest = json.load(f)
+                if manifest.get("version") == REF_TEXT_CACHE_VERSION:
+                    self.entries = manifest.get("entries", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable reference cache manifest: {e}")
+        self._dirty = False
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(path.resolve())
+
+    def _entry_file(self, entry: dict) -> Path:
+        return self.cache_dir / entry["blob"]
+
+    def get(self, path: Path) -> Optional[List[Document]]:
+        """Cached Documents for path, or None if missing or stale."""
+        entry = self.entries.get(self._key(path))
+        stat = path.stat()
+        if entry is None or entry["size"] != stat.st_size:
+            self.misses += 1
+            return None
+        if entry["mtime_ns"] != stat.st_mtime_ns:
+            if content_sha256(path) != entry["sha256"]:
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns  # touched, not modified
+            self._dirty = True
+        try:
+            with gzip.open(self._entry_file(entry), "rt", encoding="utf-8") as f:
+                pages = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [Document(page_content=p["page_content"], metadata=p["metadata"]) for p in pages]
+
+    def put(self, path: Path, docs: List[Document]) -> None:
+        stat = path.stat()
+        sha = content_sha256(path)
+        # Page metadata carries the source path, so identical files at two paths get separate blobs
+        blob = hashlib.sha256(f"{self._key(path)}\0{sha}".encode("utf-8")).hexdigest()
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha, "blob": f"{blob}.json.gz"}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        target = self._entry_file(entry)
+        tmp = target.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump([{"page_content": d.page_content, "metadata": d.metadata} for d in docs], f,
+                      separators=(",", ":"), default=str)
+        os.replace(tmp, target)
+        self.entries[self._key(path)] = entry
+        self._dirty = True
+
+    def evict(self, keep: Optional[Iterable[Path]] = None) -> int:
+        """
+        Drop entries for files that no longer exist (or, with keep, are not in keep)
+        and delete blobs no entry references any more. Returns the number of entries removed.
+        """
+        keep_keys = {self._key(p) for p in keep} if keep is not None else None
+        stale = [key for key in self.entries
+                 if not Path(key).exists() or (keep_keys is not None and key not in keep_keys)]
+        for key in stale:
+            del self.entries[key]
+        referenced = {e["blob"] for e in self.entries.values()}
+        if self.cache_dir.exists():
+            for blob in self.cache_dir.glob("*.json.gz"):
+                if blob.name not in referenced:
+                    blob.unlink()
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": REF_TEXT_CACHE_VERSION, "entries": self.entries}, f)
+        os.replace(tmp, self.manifest_path)
+        self._dirty = False
+
+    def summary(self) -> str:
+        return f"{self.hits} cached, {self.misses} parsed ({len(self.entries)} entries in {self.cache_dir})"
@@ -1,46 +1,161 @@
 import os
+import time
 from dotenv import load_dotenv
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Set, Tuple
 from langchain_community.document_loaders import (
     PyPDFLoader,
     TextLoader,
     JSONLoader,
     UnstructuredMarkdownLoader
 )
+from backend.coldrag.utils.reference_cache import REF_TEXT_CACHE, REF_TEXT_CACHE_DIR, ReferenceTextCache
 
 load_dotenv()
 
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".json", ".md"}
 
-def load_reference_docs(directory: str):
-    """Recursively load supported documents from a reference directory."""
-    docs = []
-    ref_path = Path(directory)
+REF_LOADER_WORKERS = int(os.getenv("REF_LOADER_WORKERS", 0)) or os.cpu_count() or 1
+REF_SLOW_FILE_SECONDS = float(os.getenv("REF_SLOW_FILE_SECONDS", 5))
+REF_TIMING_TOP = int(os.getenv("REF_TIMING_TOP", 10))
 
-    if not ref_path.exists():
-        print(f"⚠️ Reference path {directory} does not exist.")
-        return docs
 
-    for file in ref_path.rglob("*"):
-        if not file.is_file() or file.suffix.lower() not in ALLOWED_EXTENSIONS:
-            continue
+def list_reference_files(directory: str) -> List[Path]:
+    """Supported files under directory, in a stable (sorted) order."""
+    return sorted(
+        file for file in Path(directory).rglob("*")
+        if file.is_file() and file.suffix.lower() in ALLOWED_EXTENSIONS
+    )
+
 
+def load_reference_file(file: Path) -> list:
+    """Parse a single reference file into Documents."""
+    suffix = file.suffix.lower()
+    if suffix == ".pdf":
+        return PyPDFLoader(str(file)).load()
+    elif suffix == ".txt":
+        return TextLoader(str(file)).load()
+    elif suffix == ".json":
+        return JSONLoader(file_path=str(file), jq_schema=".", text_content=False).load()
+    elif suffix == ".md":
+        return UnstructuredMarkdownLoader(str(file)).load()
+    return []
+
+
+def _timed_load(file: Path) -> Tuple[list, float, Optional[str]]:
+    """Worker entry point: (docs, seconds, error). Exceptions never leave the worker."""
+    start = time.perf_counter()
+    try:
+        docs = load_reference_file(file)
+        return docs, time.perf_counter() - start, None
+    except Exception as e:
+        return [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+def _load_isolated(file: Path) -> Tuple[list, float, Optional[str]]:
+    """Parse one file in its own worker, so a crash can only be blamed on that file."""
+    with ProcessPoolExecutor(max_workers=1) as pool:
         try:
-            if file.suffix == ".pdf":
-                docs.extend(PyPDFLoader(str(file)).load())
+            return pool.submit(_timed_load, file).result()
+        except BrokenProcessPool as e:
+            return [], 0.0, f"worker crashed: {type(e).__name__}: {e}"
+
+
+def _load_in_pool(files: List[Path], pending: List[int], workers: int, collect) -> None:
+    """
+    Parse files[pending] across a process pool. A worker that dies (e.g. a segfault in a PDF
+    parser) breaks the whole pool and fails every unfinished future, so unfinished files are
+    resubmitted to a fresh pool; a file left unfinished by a second crash runs on its own
+    and is the only one marked failed if it crashes again.
+    """
+    remaining, crashed_once = list(pending), set()  # type: List[int], Set[int]
+    while remaining:
+        unfinished = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_timed_load, files[i]): i for i in remaining}
+            for future in as_completed(futures):
+                try:
+                    collect(futures[future], future.result())
+                except BrokenProcessPool:
+                    unfinished.append(futures[future])
+        if not unfinished:
+            return
+        print(f"⚠️ A loader worker crashed — retrying {len(unfinished)} unfinished reference files")
+        suspects = sorted(i for i in unfinished if i in crashed_once)
+        for i in suspects:
+            collect(i, _load_isolated(files[i]))
+        crashed_once.update(unfinished)
+        remaining = sorted(i for i in unfinished if i not in suspects)
 
-            elif file.suffix == ".txt":
-                docs.extend(TextLoader(str(file)).load())
 
-            elif file.suffix == ".json":
-                loader = JSONLoader(file_path=str(file), jq_schema=".", text_content=False)
-                docs.extend(loader.load())
+def report_file_timings(timings: List[Tuple[Path, float, int]], top: int = REF_TIMING_TOP) -> None:
+    """Print the slowest files so pathological documents are easy to spot."""
+    if not timings:
+        return
+    total = sum(seconds for _, seconds, _ in timings)
+    print(f"⏱️ Parsed {len(timings)} files in {total:.1f}s of worker time; slowest:")
+    for file, seconds, n_docs in sorted(timings, key=lambda t: t[1], reverse=True)[:top]:
+        print(f"   {seconds:>8.2f}s  {n_docs:>5} docs  {file}")
 
-            elif file.suffix == ".md":
-                docs.extend(UnstructuredMarkdownLoader(str(file)).load())
 
-        except Exception as e:
-            print(f"❌ Failed to load {file.name}: {e}")
+def load_reference_files(files: List[Path], workers: int = REF_LOADER_WORKERS, use_cache: bool = REF_TEXT_CACHE,
+                         cache_dir: str = REF_TEXT_CACHE_DIR) -> List[list]:
+    """
+    Load the given reference files and return their Documents per file (aligned with files).
+    Unchanged files come from the extracted-text cache; the rest are parsed (in a process
+    pool when workers > 1). A file that fails (or crashes its worker) yields an empty list;
+    files that were only in flight when another file crashed a worker are retried.
+    """
+    cache = ReferenceTextCache(cache_dir) if use_cache else None
+    per_file: List[Optional[list]] = [cache.get(file) if cache else None for file in files]
+    pending = [i for i, file_docs in enumerate(per_file) if file_docs is None]
+    timings, failed = [], []
+
+    def collect(i: int, result: Tuple[list, float, Optional[str]]) -> None:
+        file = files[i]
+        file_docs, seconds, error = result
+        if error:
+            failed.append(file)
+            print(f"❌ Failed to load {file.name}: {error}")
+        else:
+            if seconds >= REF_SLOW_FILE_SECONDS:
+                print(f"🐢 Slow reference file ({seconds:.1f}s): {file}")
+            if cache:
+                cache.put(file, file_docs)
+        timings.append((file, seconds, len(file_docs)))
+        per_file[i] = file_docs
+
+    if workers <= 1 or len(pending) <= 1:
+        for i in pending:
+            collect(i, _timed_load(files[i]))
+    else:
+        print(f"⚙️ Loading {len(pending)} reference files across {workers} processes...")
+        _load_in_pool(files, pending, workers, collect)
+
+    report_file_timings(timings)
+    if cache:
+        cache.evict()  # entries whose source file was deleted
+        cache.save()
+        print(f"🗃️ Reference text cache: {cache.summary()}")
+    if failed:
+        print(f"⚠️ {len(failed)} reference files could not be loaded")
+    return per_file
+
+
+def load_reference_docs(directory: str, workers: int = REF_LOADER_WORKERS, use_cache: bool = REF_TEXT_CACHE,
+                        cache_dir: str = REF_TEXT_CACHE_DIR):
+    """Recursively load supported documents from a reference directory, in file order."""
+    docs = []
+    ref_path = Path(directory)
+
+    if not ref_path.exists():
+        print(f"⚠️ Reference path {directory} does not exist.")
+        return docs
+
+    for file_docs in load_reference_files(list_reference_files(directory), workers, use_cache, cache_dir):
+        docs.extend(file_docs)
 
     print(f"📚 Loaded {len(docs)} reference documents from: {directory}")
     return docs
@@ -0,0 +1,112 @@
+import re
+import sys
+import json
+from typing import Iterable, List, Optional
+from langchain.schema import Document
+from backend.coldrag.utils.fingerprints import resource_fingerprint
+from backend.coldrag.utils.resource_renderer import render_resource
+
+# Leading "module.a.module.b[\"k\"]." part of a resource address
+MODULE_PREFIX = re.compile(r'^((?:module\.[^.\[]+(?:\[[^\]]*\])?\.)*)')
+
+# Slots holding identity strings that are re-interned after unpickling
+_INTERNED = ("kind", "resource_type", "address", "name", "provider", "module_address", "action")
+
+# Precedence used by every report when a change has several actions (e.g. delete + create)
+ACTION_ORDER = ("create", "update", "delete")
+
+
+def module_address_of(address: str) -> str:
+    """Derive the module path ("module.compute") from a resource address ("" for the root module)."""
+    return MODULE_PREFIX.match(address).group(1).rstrip(".")
+
+
+def classify_action(actions: List[str]) -> str:
+    """Bucket a change's action list into create / update / delete / other."""
+    return next((a for a in ACTION_ORDER if a in actions), "other")
+
+
+class ResourceRecord:
+    """
+    Compact in-memory form of a single Terraform resource.
+    Holds interned identity strings plus the resource body as compact UTF-8 JSON;
+    the indented text and the LangChain Document are only built on demand.
+    """
+    __slots__ = ("kind", "resource_type", "address", "name", "provider", "module_address", "action",
+                 "fingerprint", "payload")
+
+    def __init__(self, kind: str, resource_type: str, address: str, name: str, provider: str,
+                 module_address: str, action: str, fingerprint: str, payload: bytes):
+        self.kind = kind
+        self.resource_type = resource_type
+        self.address = address
+        self.name = name
+        self.provider = provider
+        self.module_address = module_address
+        self.action = action
+        self.fingerprint = fingerprint
+        self.payload = payload
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, sys.intern(value) if slot in _INTERNED else value)
+
+    @classmethod
+    def from_resource(cls, res: dict, kind: str, module_address: Optional[str] = None) -> "ResourceRecord":
+        """Build a record from a plan resource change ("plan") or state resource ("state")."""
+        address = res.get("address", "unknown")
+        change = res.get("change")
+        actions = change.get("actions", []) if isinstance(change, dict) else []
+        if module_address is None:
+            module_address = res.get("module_address") or module_address_of(address)
+        return cls(
+            kind=sys.intern(kind),
+            resource_type=sys.intern(res.get("type", "unknown")),
+            address=sys.intern(address),
+            name=sys.intern(res.get("name", "unknown")),
+            provider=sys.intern(res.get("provider_name", "unknown")),
+            module_address=sys.intern(module_address),
+            action=sys.intern(classify_action(actions)),
+            fingerprint=resource_fingerprint(res),
+            payload=json.dumps(res, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+        )
+
+    @property
+    def resource_name(self) -> str:
+        """Plans are labelled by address, states by resource name (matches the original metadata)."""
+        return self.address if self.kind == "plan" else self.name
+
+    @property
+    def resource(self) -> dict:
+        """Decode the original resource dict."""
+        return json.loads(self.payload)
+
+    @property
+    def text(self) -> str:
+        """Render the resource the way it is embedded and prompted (compact when COMPACT_RENDERING)."""
+        return render_resource(self.resource)
+
+    @property
+    def metadata(self) -> dict:
+        return {
+            "resource_type": self.resource_type,
+            "resource_name": self.resource_name,
+            "standard": self.resource_type.upper(),
+            "source": self.resource_name.upper(),
+            "module_address": self.module_address
+        }
+
+    def to_document(self) -> Document:
+        """Materialize a LangChain Document (only at embedding / prompting time)."""
+        return Document(page_content=self.text, metadata=self.metadata)
+
+    def __repr__(self) -> str:
+        return f"ResourceRecord({self.kind}, {self.address})"
+
+
+def records_to_documents(records: Iterable[ResourceRecord]) -> List[Document]:
+    """Convert records to Documents right before they are embedded."""
+    return [record.to_document() for record in records]
@@ -0,0 +1,107 @@
+import os
+import json
+from typing import Any, Iterable
+from dotenv import load_dotenv
+
+load_dotenv()
+
+COMPACT_RENDERING = os.getenv("COMPACT_RENDERING", "false").lower() == "true"
+
+# Plan bookkeeping that tells the LLM nothing about compliance posture
+NOISE_KEYS = {"after_unknown", "before_sensitive", "after_sensitive"}
+
+# Marker keys for a collapsed list of same-shaped objects
+KEYS_FIELD, ROWS_FIELD = "~keys", "~rows"
+
+_EMPTY = object()
+
+
+def prune(value: Any) -> Any:
+    """Recursively drop nulls, empty strings/lists/maps and unknown/sensitive bookkeeping."""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, sub in value.items():
+            if key in NOISE_KEYS:
+                continue
+            sub = prune(sub)
+            if sub is not _EMPTY:
+                pruned[key] = sub
+        return pruned or _EMPTY
+    if isinstance(value, list):
+        pruned = [sub for sub in (prune(item) for item in value) if sub is not _EMPTY]
+        return pruned or _EMPTY
+    if value is None or value == "":
+        return _EMPTY
+    return value
+
+
+def collapse_repeated_keys(value: Any) -> Any:
+    """
+    Rewrite lists of objects that share the same keys (ingress rules, tags blocks, ...)
+    as one header plus value rows, so each key is emitted once per list instead of per item.
+    """
+    if isinstance(value, dict):
+        return {key: collapse_repeated_keys(sub) for key, sub in value.items()}
+    if isinstance(value, list):
+        items = [collapse_repeated_keys(item) for item in value]
+        if len(items) > 1 and all(isinstance(item, dict) for item in items):
+            keys = list(items[0])
+            if len(keys) > 1 and all(list(item) == keys for item in items[1:]):
+                return {KEYS_FIELD: keys, ROWS_FIELD: [[item[k] for k in keys] for item in items]}
+        return items
+    return value
+
+
+def render_compact(res: dict) -> str:
+    """Canonical compact rendering of a resource for prompts and embeddings."""
+    pruned = prune(res)
+    if pruned is _EMPTY:
+        return "{}"
+    return json.dumps(collapse_repeated_keys(pruned), separators=(",", ":"), ensure_ascii=False)
+
+
+def render_verbose(res: dict) -> str:
+    """The original indent=2 rendering."""
+    return json.dumps(res, indent=2)
+
+
+def render_resource(res: dict, compact: bool = COMPACT_RENDERING) -> str:
+    return render_compact(res) if compact else render_verbose(res)
+
+
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count (tiktoken cl100k if installed, else ~4 chars/token)."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def report_token_savings(resources: Iterable[dict]) -> dict:
+    """Compare verbose vs compact rendering token counts across a plan and print a summary."""
+    count, verbose_tokens, compact_tokens = 0, 0, 0
+    for res in resources:
+        count += 1
+        verbose_tokens += count_tokens(render_verbose(res))
+        compact_tokens += count_tokens(render_compact(res))
+
+    saved = verbose_tokens - compact_tokens
+    ratio = saved / verbose_tokens if verbose_tokens else 0.0
+    print(f"✂️ Compact rendering: {verbose_tokens} → {compact_tokens} tokens across {count} resources "
+          f"({saved} saved, {ratio:.0%})")
+    return {
+        "resources": count,
+        "verbose_tokens": verbose_tokens,
+        "compact_tokens": compact_tokens,
+        "tokens_saved": saved,
+        "ratio_saved": round(ratio, 4),
+    }
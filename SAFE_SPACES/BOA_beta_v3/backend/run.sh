@@ -58,6 +58,12 @@ else
     echo "⏭️ Skipping model training."
 fi
 
+# --- Embedding Daemon ---
+if [ "${START_EMBED_DAEMON:-false}" = "true" ]; then
+    echo "🛰️ Starting embedding daemon..."
+    bash "$EMBED_DAEMON_SCRIPT" start
+fi
+
 # --- RAG Compliance Inspector ---
 echo "🕵️ Running RAG Inspector..."
 bash "$RAG_INSPECTOR_SCRIPT"
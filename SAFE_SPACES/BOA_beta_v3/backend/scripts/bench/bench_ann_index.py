@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: flat vs HNSW vs IVF-PQ, each optionally PCA-projected — build time, resident
+index size, query latency and recall@k against exact search, before and after re-ranking
+the candidates with the full-precision vectors (the recall / memory tradeoff report).
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+
+from backend.coldrag.train.ann_index import (
+    ANN_MEMORY_MB, ANN_RERANK, FLAT_FILE, ANN_SPEC_FILE, VECTORS_FILE, LIVE_FILE,
+    choose_index_spec, build_ann_index, is_lossy, AnnIndex
+)
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int = 256, seed: int = 7) -> np.ndarray:
+    """Unit vectors around topic centroids, roughly how chunk embeddings of a regulatory corpus cluster."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def index_vectors(index_dir: str) -> np.ndarray:
+    """Vectors of a persisted reference index (flat or ANN), to benchmark on the real corpus."""
+    import json
+    import faiss
+    spec_path = Path(index_dir) / ANN_SPEC_FILE
+    if not spec_path.exists():
+        index = faiss.read_index(str(Path(index_dir) / FLAT_FILE))
+        return index.reconstruct_n(0, index.ntotal)
+    spec = json.loads(spec_path.read_text())
+    vectors = np.memmap(Path(index_dir) / VECTORS_FILE, dtype=np.float32, mode="r", shape=(spec["rows"], spec["dim"]))
+    return np.array(vectors[np.load(Path(index_dir) / LIVE_FILE)])
+
+
+def timed_search(index, queries: np.ndarray, k: int):
+    found = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):  # one at a time, like retriever calls
+        start = time.perf_counter()
+        found[i] = index.search(query[None, :], k)[1][0]
+        latencies.append((time.perf_counter() - start) * 1000)
+    return found, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ANN index benchmark (recall vs flat, latency, build, RAM)")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--memory-mb", type=int, default=ANN_MEMORY_MB, help="Budget used by the auto choice")
+    parser.add_argument("--kinds", default="flat,hnsw,ivfpq")
+    parser.add_argument("--pca-dims", default="0", help="Comma-separated PCA dimensions to try (0 = none)")
+    parser.add_argument("--rerank", type=int, default=ANN_RERANK or 4, help="Candidates per result re-scored at full precision")
+    parser.add_argument("--from-index", help="Use the vectors of a persisted reference index instead of synthetic ones")
+    args = parser.parse_args()
+
+    import faiss
+    if args.from_index:
+        data = index_vectors(args.from_index)
+        rows = np.random.default_rng(3).permutation(len(data))
+        queries, vectors = data[rows[:args.queries]], data[rows[args.queries:]]
+        args.vectors, args.dim = vectors.shape
+    else:
+        data = synthetic_embeddings(args.vectors + args.queries, args.dim)
+        vectors, queries = data[:args.vectors], data[args.vectors:]
+    auto = choose_index_spec(args.vectors, args.dim, kind="auto", memory_mb=args.memory_mb, pca_dim=0)
+    truth = faiss.knn(queries, vectors, args.k)[1]
+    full_mb = vectors.nbytes / 1024 / 1024
+    workdir = tempfile.TemporaryDirectory()
+    vectors_path = Path(workdir.name) / VECTORS_FILE
+    vectors.tofile(vectors_path)  # re-ranking reads the memory-mapped file, as in production
+
+    print(f"\n📊 {args.vectors} × {args.dim} vectors ({full_mb:.0f} MB float32), {args.queries} queries, k={args.k}, "
+          f"budget {args.memory_mb} MB → auto picks {auto['kind'].upper()}")
+    print("-" * 104)
+    print(f"{'index':<8}{'pca':>6}{'build s':>9}{'index MB':>10}{'ratio':>7}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'recall@k':>10}{'re-ranked':>11}{'rr p50 ms':>11}  params")
+    for kind in args.kinds.split(","):
+        for pca_dim in (int(d) for d in args.pca_dims.split(",")):
+            if kind == "flat" and pca_dim:
+                continue  # flat stays exact
+            spec = choose_index_spec(args.vectors, args.dim, kind=kind, memory_mb=args.memory_mb, pca_dim=pca_dim)
+            start = time.perf_counter()
+            index = build_ann_index(vectors, spec)
+            build = time.perf_counter() - start
+            size_mb = faiss.serialize_index(index).nbytes / 1024 / 1024
+
+            found, latencies = timed_search(index, queries, args.k)
+            reranked, rerank_p50 = "-", "-"
+            if is_lossy(spec) and args.rerank:
+                found_rr, latencies_rr = timed_search(AnnIndex(index, spec, vectors_path, rerank=args.rerank),
+                                                      queries, args.k)
+                reranked, rerank_p50 = f"{recall_at_k(found_rr, truth):.3f}", f"{np.percentile(latencies_rr, 50):.3f}"
+            print(f"{kind:<8}{pca_dim or '-':>6}{build:>9.2f}{size_mb:>10.1f}{full_mb / size_mb:>6.1f}x"
+                  f"{np.percentile(latencies, 50):>9.3f}{np.percentile(latencies, 95):>9.3f}"
+                  f"{recall_at_k(found, truth):>10.3f}{reranked:>11}{rerank_p50:>11}  {spec['params']}")
+    print("-" * 104)
+    print(f"Re-ranking reads k × {args.rerank} full-precision vectors per query from disk "
+          f"({full_mb:.0f} MB memory-mapped, not resident).")
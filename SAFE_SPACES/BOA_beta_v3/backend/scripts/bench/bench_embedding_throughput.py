@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""CPU throughput (chunks/sec): HuggingFaceEmbeddings.embed_documents (the embedder used before
+BucketedEmbeddings) vs length-bucketed batches, per thread count, and optionally torch fp32 vs
+the ONNX Runtime int8 export."""
+
+import os
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from synthetic_plan import synthetic_plan
+from langchain_huggingface import HuggingFaceEmbeddings
+from backend.coldrag.utils.plan_parser import extract_records_from_plan
+from backend.coldrag.train.embedding_setup import EMBEDDING_MODEL, split_documents
+from backend.coldrag.train.embedding_engine import (
+    EMBED_BATCH_SIZE, BucketedEmbeddings, OnnxEmbeddings, set_embedding_threads
+)
+
+
+def benchmark_chunks(n: int) -> list:
+    """A mix of short plan resources and long prose chunks, shuffled like a real corpus."""
+    random.seed(7)
+    plan_texts = [r.text for r in extract_records_from_plan(synthetic_plan(n // 2))]
+    prose = " ".join(f"Control AC-{i}: limit system access to authorized users and processes." for i in range(400))
+    from langchain.schema import Document
+    prose_chunks = [d.page_content for d in split_documents([Document(page_content=prose)])]
+    texts = plan_texts + [random.choice(prose_chunks)[:random.randint(100, 1000)] for _ in range(n - len(plan_texts))]
+    random.shuffle(texts)
+    return texts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding throughput benchmark")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--threads", default=",".join(str(t) for t in sorted({1, 4, os.cpu_count() or 1})),
+                        help="Comma-separated torch thread counts to try")
+    parser.add_argument("--onnx", help="ONNX export directory (export_onnx.py) to compare against torch")
+    args = parser.parse_args()
+
+    texts = benchmark_chunks(args.chunks)
+    # Configured as the inspector did before BucketedEmbeddings replaced it
+    baseline = HuggingFaceEmbeddings(model_name=args.model)
+    baseline.embed_documents(texts[:args.batch_size])  # warm-up
+    engine = BucketedEmbeddings(args.model, batch_size=args.batch_size)
+    engine.encode(texts[:args.batch_size])  # warm-up
+
+    print(f"\n📊 {len(texts)} chunks, batch size {args.batch_size}, model {args.model}")
+    print("-" * 64)
+    print(f"{'threads':>8}{'HF embed_docs c/s':>20}{'bucketed c/s':>18}{'speedup':>12}")
+    for threads in (int(t) for t in args.threads.split(",")):
+        set_embedding_threads(threads)
+        start = time.perf_counter()
+        baseline.embed_documents(texts)
+        hf_rate = len(texts) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        engine.encode(texts)
+        bucketed = len(texts) / (time.perf_counter() - start)
+        print(f"{threads:>8}{hf_rate:>20.1f}{bucketed:>18.1f}{bucketed / hf_rate:>11.2f}x")
+    print("-" * 64)
+
+    if args.onnx:
+        print(f"{'threads':>8}{'torch fp32 c/s':>20}{'onnx int8 c/s':>18}{'speedup':>12}")
+        for threads in (int(t) for t in args.threads.split(",")):
+            set_embedding_threads(threads)
+            onnx = OnnxEmbeddings(args.onnx, batch_size=args.batch_size, threads=threads)
+            onnx.encode(texts[:args.batch_size])  # warm-up
+            start = time.perf_counter()
+            engine.encode(texts)
+            torch_rate = len(texts) / (time.perf_counter() - start)
+            start = time.perf_counter()
+            onnx.encode(texts)
+            onnx_rate = len(texts) / (time.perf_counter() - start)
+            print(f"{threads:>8}{torch_rate:>20.1f}{onnx_rate:>18.1f}{onnx_rate / torch_rate:>11.2f}x")
+        print("-" * 64)
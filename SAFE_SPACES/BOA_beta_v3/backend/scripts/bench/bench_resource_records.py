@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: per-resource LangChain Documents vs compact ResourceRecords. The baseline
+is the representation before ResourceRecords: one Document per resource holding the
+resource as json.dumps(res, indent=2).
+"""
+
+import gc
+import sys
+import json
+import argparse
+import tracemalloc
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from synthetic_plan import synthetic_plan
+from langchain.schema import Document
+from backend.coldrag.utils.plan_parser import extract_documents_from_plan, extract_records_from_plan
+
+
+def indented_documents(plan: dict) -> list:
+    """Documents as plan_parser built them before ResourceRecords (pinned here as the baseline)."""
+    docs = []
+    for res in plan.get("resource_changes", []):
+        resource_type, resource_name = res.get("type", "unknown"), res.get("address", "unknown")
+        docs.append(Document(page_content=json.dumps(res, indent=2),
+                             metadata={"resource_type": resource_type, "resource_name": resource_name,
+                                       "standard": resource_type.upper(), "source": resource_name.upper()}))
+    return docs
+
+
+def retained_bytes(build, plan: dict):
+    """Return (retained, peak) bytes allocated by build(plan) while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    result = build(plan)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Document vs ResourceRecord memory use")
+    parser.add_argument("--resources", type=int, default=50000)
+    args = parser.parse_args()
+
+    plan = synthetic_plan(args.resources)
+    docs_cur, docs_peak = retained_bytes(indented_documents, plan)
+    compact_cur, compact_peak = retained_bytes(extract_documents_from_plan, plan)
+    recs_cur, recs_peak = retained_bytes(extract_records_from_plan, plan)
+
+    mb = 1024 * 1024
+    print(f"\n📊 {args.resources} resources")
+    print("-" * 62)
+    print(f"{'representation':<24}{'retained MB':>14}{'peak MB':>12}{'B/res':>12}")
+    for label, cur, peak in (("Document (indent=2)", docs_cur, docs_peak),
+                             ("Document (compact)", compact_cur, compact_peak),
+                             ("ResourceRecord", recs_cur, recs_peak)):
+        print(f"{label:<24}{cur / mb:>14.1f}{peak / mb:>12.1f}{cur / args.resources:>12.0f}")
+    print("-" * 62)
+    print(f"Saving: {100 * (1 - recs_cur / docs_cur):.1f}% retained memory vs indent=2 Documents, "
+          f"{100 * (1 - recs_cur / compact_cur):.1f}% vs compact Documents\n")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Benchmark: parse a raw terraform.tfstate directly vs `terraform show -json` + parse."""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from synthetic_plan import synthetic_state
+from backend.coldrag.utils.plan_parser import load_terraform_records
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def show_json(state_path: str, workdir: str, output_path: str) -> None:
+    """The route terraform_pipeline.sh used to take: spawn the CLI to re-encode the state."""
+    with open(output_path, "w") as out:
+        subprocess.run(["terraform", "show", "-json", state_path], cwd=workdir, stdout=out,
+                       stderr=subprocess.PIPE, check=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raw tfstate ingestion vs terraform show -json")
+    parser.add_argument("--state", help="Existing terraform.tfstate (default: synthetic)")
+    parser.add_argument("--resources", type=int, default=20000, help="Synthetic resource instances")
+    parser.add_argument("--workdir", default=str(ROOT_DIR / "infra" / "terraform"),
+                        help="Initialized Terraform directory (provider schemas) for terraform show")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_state_"))
+    try:
+        state_path = args.state
+        if not state_path:
+            state_path = str(tmp / "terraform.tfstate")
+            with open(state_path, "w") as f:
+                json.dump(synthetic_state(args.resources), f)
+
+        direct, direct_s = timed(lambda: list(load_terraform_records(state_path, stream=False)))
+        streamed, streamed_s = timed(lambda: list(load_terraform_records(state_path, stream=True)))
+
+        print(f"\n📊 {len(direct)} state resource instances ({Path(state_path).name})")
+        print("-" * 56)
+        print(f"{'route':<34}{'seconds':>10}{'speedup':>12}")
+        print(f"{'raw tfstate (json.load)':<34}{direct_s:>10.2f}{'':>12}")
+        print(f"{'raw tfstate (streaming)':<34}{streamed_s:>10.2f}{'':>12}")
+
+        if shutil.which("terraform") is None:
+            print("⚠️ terraform not on PATH — skipping the `terraform show -json` route")
+        else:
+            shown_path = str(tmp / "state.json")
+            try:
+                _, show_s = timed(lambda: show_json(str(Path(state_path).resolve()), args.workdir, shown_path))
+                shown, parse_s = timed(lambda: list(load_terraform_records(shown_path, stream=False)))
+                total = show_s + parse_s
+                print(f"{'terraform show -json + parse':<34}{total:>10.2f}{total / direct_s:>11.1f}x")
+                same = [(r.address, r.fingerprint) for r in shown] == [(r.address, r.fingerprint) for r in direct]
+                print(f"{'✅' if same else '⚠️'} Addresses/fingerprints identical across routes: {same}")
+            except subprocess.CalledProcessError as e:
+                print(f"⚠️ terraform show failed (is {args.workdir} initialized?): {e.stderr.decode().strip()}")
+        print("-" * 56)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
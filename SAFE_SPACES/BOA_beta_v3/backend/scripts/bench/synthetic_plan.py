@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Generate synthetic Terraform plan JSON of arbitrary size for benchmarks."""
+
+import json
+import random
+import argparse
+
+RESOURCE_TEMPLATES = {
+    "aws_s3_bucket": lambda i: {
+        "bucket": f"cmmc-data-{i}",
+        "force_destroy": False,
+        "tags": {"Environment": "prod", "Owner": "secops"},
+        "server_side_encryption_configuration": [
+            {"rule": [{"apply_server_side_encryption_by_default": [{"sse_algorithm": "aws:kms", "kms_master_key_id": None}]}]}
+        ],
+    },
+    "aws_security_group": lambda i: {
+        "name": f"sg-{i}",
+        "description": "Managed by Terraform",
+        "ingress": [{"from_port": 443, "to_port": 443, "protocol": "tcp", "cidr_blocks": ["10.0.0.0/16"]}],
+        "egress": [{"from_port": 0, "to_port": 0, "protocol": "-1", "cidr_blocks": ["0.0.0.0/0"]}],
+        "tags": None,
+    },
+    "aws_instance": lambda i: {
+        "ami": "ami-0c55b159cbfafe1f0",
+        "instance_type": random.choice(["t3.micro", "t3.small", "m5.large"]),
+        "availability_zone": "us-west-2a",
+        "root_block_device": [{"encrypted": True, "volume_size": 30, "kms_key_id": None}],
+        "tags": {"Name": f"app-{i}"},
+    },
+    "aws_subnet": lambda i: {
+        "cidr_block": f"10.{(i // 256) % 256}.{i % 256}.0/24",
+        "map_public_ip_on_launch": False,
+        "tags": {},
+    },
+}
+
+
+def synthetic_resource(i: int, module: str = None) -> dict:
+    r_type = random.choice(list(RESOURCE_TEMPLATES))
+    name = f"res_{i}"
+    address = f"{r_type}.{name}" if not module else f"{module}.{r_type}.{name}"
+    change = {
+        "address": address,
+        "mode": "managed",
+        "type": r_type,
+        "name": name,
+        "provider_name": "registry.terraform.io/hashicorp/aws",
+        "change": {
+            "actions": [random.choice(["create", "create", "update", "delete"])],
+            "before": None,
+            "after": RESOURCE_TEMPLATES[r_type](i),
+            "after_unknown": {"arn": True, "id": True, "tags_all": True},
+            "before_sensitive": False,
+            "after_sensitive": {"tags": {}, "tags_all": {}},
+        },
+    }
+    if module:
+        change["module_address"] = module
+    return change
+
+
+def synthetic_plan(n: int, seed: int = 42) -> dict:
+    """Build a plan dict with n resource_changes spread across a few modules."""
+    random.seed(seed)
+    modules = [None, "module.networking", "module.compute", "module.s3"]
+    changes = [synthetic_resource(i, modules[i % len(modules)]) for i in range(n)]
+    return {
+        "format_version": "1.2",
+        "terraform_version": "1.8.0",
+        "planned_values": {"root_module": {"resources": [c["change"]["after"] for c in changes]}},
+        "resource_changes": changes,
+        "configuration": {"root_module": {}},
+    }
+
+
+def synthetic_state(n: int, seed: int = 42, count: int = 2) -> dict:
+    """Build a raw terraform.tfstate (v4) dict: n/count resources with `count` instances each."""
+    random.seed(seed)
+    modules = ["", "module.networking", "module.compute", "module.s3"]
+    resources = []
+    for i in range(max(1, n // count)):
+        r_type = random.choice(list(RESOURCE_TEMPLATES))
+        module = modules[i % len(modules)]
+        resource = {
+            "mode": "managed",
+            "type": r_type,
+            "name": f"res_{i}",
+            "provider": 'provider["registry.terraform.io/hashicorp/aws"]',
+            "instances": [
+                {"index_key": k, "schema_version": 1, "attributes": RESOURCE_TEMPLATES[r_type](i * count + k),
+                 "sensitive_attributes": []}
+                for k in range(count)
+            ],
+        }
+        if module:
+            resource["module"] = module
+            resource["provider"] = f"{module}.{resource['provider']}"
+        resources.append(resource)
+    return {"version": 4, "terraform_version": "1.8.0", "serial": 1, "lineage": "synthetic",
+            "outputs": {}, "resources": resources, "check_results": None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic Terraform plan JSON")
+    parser.add_argument("output", help="Path to write the plan JSON")
+    parser.add_argument("--resources", type=int, default=50000, help="Number of resource_changes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--state", action="store_true", help="Write a raw terraform.tfstate (v4) instead")
+    args = parser.parse_args()
+
+    build = synthetic_state if args.state else synthetic_plan
+    with open(args.output, "w") as f:
+        json.dump(build(args.resources, args.seed), f)
+    print(f"✅ Wrote {args.resources} synthetic resources to {args.output}")
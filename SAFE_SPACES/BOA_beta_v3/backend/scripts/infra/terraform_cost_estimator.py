@@ -1,8 +1,14 @@
+import sys
 import argparse
-import json
+from pathlib import Path
 from pricing import get_live_price
 from utils import infer_module, format_cost
 
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+from backend.coldrag.utils.fingerprints import FingerprintLedger
+from backend.coldrag.utils.plan_model import TerraformPlan
+
 
 # Static fallback prices (used when --live is False or pricing fails)
 STATIC_PRICES = {
@@ -29,23 +35,38 @@ def estimate_cost(resource_type, live=False, cache={}):
             return price
     return STATIC_PRICES.get(resource_type, STATIC_PRICES["default"])
 
-def summarize_costs(plan_path, live=False):
-    with open(plan_path, "r") as f:
-        plan = json.load(f)
+def summarize_costs(plan_path, live=False, ledger=None, where=None, missing=None):
+    # Accepts a path or an already loaded TerraformPlan shared with the other pipeline stages
+    plan = plan_path if isinstance(plan_path, TerraformPlan) else TerraformPlan.load(plan_path)
+    records = plan.records
 
-    resource_changes = plan.get("resource_changes", [])
+    # Optional attribute filter, e.g. where="ingress.cidr_blocks=0.0.0.0/0" or missing="kms_key_id"
+    if where or missing:
+        path, _, value = (where or missing).partition("=")
+        selected = plan.index.query(path, value or None, missing=bool(missing))
+        records = [r for r in records if r.address in selected]
     summary = {"create": [], "update": [], "delete": [], "other": []}
     total_cost = 0.0
+    costs = []
 
-    for change in resource_changes:
-        actions = change.get("change", {}).get("actions", [])
-        r_type = change.get("type")
-        action_type = next((a for a in ["create", "update", "delete"] if a in actions), "other")
-        cost = estimate_cost(r_type, live=live)
-        summary[action_type].append((change, cost))
-        if action_type == "create":
+    for record in records:
+        # Live lookups are slow; reuse the price of any resource content seen in an earlier run
+        fingerprint = record.fingerprint
+        if live and ledger is not None and ledger.has("cost", fingerprint):
+            cost = ledger.get("cost", fingerprint)
+        else:
+            cost = estimate_cost(record.resource_type, live=live)
+            if live and ledger is not None:
+                ledger.put("cost", fingerprint, cost)
+        summary[record.action].append((record.resource, cost))
+        costs.append(cost)
+        if record.action == "create":
             total_cost += cost
 
+    # Full-plan runs fill the cost column so the API/report can aggregate without re-pricing
+    if not (where or missing):
+        plan.store_costs(costs)
+
     return summary, total_cost
 
 def display_summary(summary, total_cost):
@@ -61,9 +82,15 @@ if __name__ == "__main__":
     parser.add_argument("--plan", required=True, help="Path to terraform plan JSON")
     parser.add_argument("--live", action="store_true", help="Use live AWS pricing")
     parser.add_argument("--summary", action="store_true", help="Print cost summary to console")
+    parser.add_argument("--no-ledger", action="store_true", help="Ignore cached prices in the fingerprint ledger")
+    parser.add_argument("--where", help="Only cost resources matching PATH or PATH=VALUE (e.g. ingress.cidr_blocks=0.0.0.0/0)")
+    parser.add_argument("--missing", help="Only cost resources where attribute PATH is absent")
 
     args = parser.parse_args()
-    summary, total = summarize_costs(args.plan, live=args.live)
+    ledger = None if args.no_ledger else FingerprintLedger()
+    summary, total = summarize_costs(args.plan, live=args.live, ledger=ledger, where=args.where, missing=args.missing)
+    if ledger is not None and args.live:
+        ledger.save()
     
     if args.summary:
         display_summary(summary, total)
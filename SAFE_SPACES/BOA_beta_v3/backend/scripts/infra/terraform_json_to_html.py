@@ -14,6 +14,7 @@ parser.add_argument("--input", required=True, help="Path to Terraform plan JSON"
 parser.add_argument("--output", required=True, help="Path to save the HTML output")
 parser.add_argument("--theme", default="dark", choices=["dark", "light"], help="Theme for the HTML report")
 parser.add_argument("--compliance", default="output/findings/compliance_violations.json", help="Path to compliance results JSON")
+parser.add_argument("--no-ledger", action="store_true", help="Ignore cached prices in the fingerprint ledger")
 args = parser.parse_args()
 
 tf_json_path = args.input
@@ -38,6 +39,11 @@ estimator_path = os.path.abspath(os.path.join(current_dir, "../../infra/scripts"
 sys.path.insert(0, estimator_path)
 from estimator import estimate_cost  # Live pricing
 
+# Shared plan model + fingerprint ledger (same as the RAG inspector and cost estimator)
+sys.path.append(os.path.abspath(os.path.join(current_dir, "../../..")))
+from backend.coldrag.utils.fingerprints import FingerprintLedger
+from backend.coldrag.utils.plan_model import TerraformPlan
+
 # Function to infer module grouping
 def infer_module(name):
     name = name.lower()
@@ -60,11 +66,12 @@ def infer_module(name):
     return "General"
 
 # Generate HTML
-def generate_html(plan_json, compliance_json):
+def generate_html(plan_json, compliance_json, ledger=None):
     pst = pytz.timezone('America/Los_Angeles')
     timestamp = datetime.datetime.now(pst).strftime("%Y-%m-%d %I:%M:%S %p PST")
     user = getpass.getuser()
-    resource_changes = plan_json.get("resource_changes", [])
+    # Accept the shared TerraformPlan model (preferred) or a raw plan dict
+    plan = plan_json if isinstance(plan_json, TerraformPlan) else TerraformPlan.from_data(plan_json)
 
     # DEBUG: how many violations did we load?
     violations = (compliance_json if isinstance(compliance_json, list)
@@ -74,17 +81,23 @@ def generate_html(plan_json, compliance_json):
     # Group resources and compute cost
     grouped = {"create": {}, "update": {}, "delete": {}, "other": {}}
     total_cost = 0.0
-    for change in resource_changes:
-        actions = change.get("change", {}).get("actions", [])
-        name = change.get("name", "")
-        r_type = change.get("type", "")
+    for record in plan.records:
+        change = record.resource
+        name = record.name
+        r_type = record.resource_type
         module = infer_module(name)
-        action_type = next((a for a in ["create", "update", "delete"] if a in actions), "other")
-        cost = estimate_cost(change) or 0.0
+        action_type = record.action
+        fingerprint = record.fingerprint
+        if ledger is not None and ledger.has("html_cost", fingerprint):
+            cost = ledger.get("html_cost", fingerprint)
+        else:
+            cost = estimate_cost(change) or 0.0
+            if ledger is not None:
+                ledger.put("html_cost", fingerprint, cost)
         if cost == 0.0:
             logging.warning(f"No pricing found for {r_type} ({name}), defaulting to $0.00")
         grouped[action_type].setdefault(module, []).append((change, cost))
-        if "create" in actions:
+        if action_type == "create":
             total_cost += cost
 
     # Prepare compliance section data
@@ -276,7 +289,7 @@ function searchResources() {{
 <div class="meta">
 Generated by: <strong>{user}</strong><br>
 Timestamp: <strong>{timestamp}</strong><br>
-Total resources affected: <strong>{len(resource_changes)}</strong><br>
+Total resources affected: <strong>{len(plan)}</strong><br>
 Estimated monthly AWS cost: <strong>${total_cost:.2f}</strong>
 </div>
 <div class="controls">
@@ -399,8 +412,7 @@ if __name__ == "__main__":
         'findings',
         'compliance_violations.json'
     )
-    with open(args.input, "r") as f:
-        tf_data = json.load(f)
+    tf_data = TerraformPlan.load(args.input)
     import logging
     try:
         with open(args.compliance, "r") as f:
@@ -421,7 +433,10 @@ if __name__ == "__main__":
             "recommendations": []
         }
 
-    html = generate_html(tf_data, comp_data)
+    ledger = None if args.no_ledger else FingerprintLedger()
+    html = generate_html(tf_data, comp_data, ledger=ledger)
+    if ledger is not None:
+        ledger.save()
     with open(args.output, "w") as f:
         f.write(html)
         
\ No newline at end of file
@@ -0,0 +1,54 @@
+#!/bin/bash
+# Starts (or stops) the resident embedding daemon: warm model + reference index on a Unix socket
+# Usage: embed_daemon.sh [start|stop]
+
+set -euo pipefail
+
+ACTION="${1:-start}"
+SOCKET="${EMBED_DAEMON_SOCKET:-${ROOT_DIR}/output/run/coldrag.sock}"
+LOG_FILE="$(dirname "$SOCKET")/embed_daemon.log"
+PID_FILE="$(dirname "$SOCKET")/embed_daemon.pid"
+VENV_PYTHON="${ROOT_DIR}/${VENV_PATH}/bin/python3"
+
+mkdir -p "$(dirname "$SOCKET")"
+
+if [[ "$ACTION" == "stop" ]]; then
+  if [[ -f "$PID_FILE" ]] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
+    echo "🛑 Stopping embedding daemon (pid $(cat "$PID_FILE"))..."
+    kill "$(cat "$PID_FILE")"
+  else
+    echo "⏭️ Embedding daemon not running."
+  fi
+  rm -f "$PID_FILE"
+  exit 0
+fi
+
+if [[ -S "$SOCKET" && -f "$PID_FILE" ]] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
+  echo "✅ Embedding daemon already running (pid $(cat "$PID_FILE"))"
+  exit 0
+fi
+
+DAEMON_ARGS=(--socket "$SOCKET" --model "$EMBEDDING_MODEL")
+if [[ -d "${REFERENCE_DIR:-}" ]]; then
+  DAEMON_ARGS+=(--refdir "$REFERENCE_DIR")
+fi
+
+echo "🛰️ Starting embedding daemon (log: $LOG_FILE)..."
+cd "$ROOT_DIR"
+nohup "$VENV_PYTHON" -m backend.coldrag.daemon.server "${DAEMON_ARGS[@]}" >> "$LOG_FILE" 2>&1 &
+echo $! > "$PID_FILE"
+
+# Model load + reference sync happen before the socket is bound
+for _ in $(seq 1 "${EMBED_DAEMON_START_TIMEOUT:-300}"); do
+  if [[ -S "$SOCKET" ]]; then
+    echo "✅ Embedding daemon ready on $SOCKET"
+    exit 0
+  fi
+  if ! kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
+    echo "⚠️ Embedding daemon exited — see $LOG_FILE. Continuing in-process."
+    rm -f "$PID_FILE"
+    exit 0
+  fi
+  sleep 1
+done
+echo "⚠️ Embedding daemon not ready after ${EMBED_DAEMON_START_TIMEOUT:-300}s — continuing; clients fall back to in-process."
@@ -24,10 +24,36 @@ VENV_PYTHON="${ROOT_DIR}/${VENV_PATH}/bin/python3"
 # Execute Python script with or without reference docs
 RAG_SCRIPT_PATH="${RAG_INSPECTOR_MODULE:-coldrag/scripts/core/rag_inspector.py}"
 
+EXTRA_ARGS=()
+
+# Delta mode: only analyze what changed since the previous plan (needs prior findings)
+if [[ "${DELTA_MODE:-false}" == "true" && "$PLAN_INPUT" == "$PLAN_JSON" \
+      && -f "${PREV_PLAN_JSON:-}" && -f "$OUTPUT_FILE" ]]; then
+  echo "🔀 Delta mode — comparing against $PREV_PLAN_JSON"
+  EXTRA_ARGS+=(--delta-from "$PREV_PLAN_JSON")
+fi
+
 if [[ -d "$REFERENCE_DIR" ]]; then
   echo "📂 Including reference docs from $REFERENCE_DIR"
-  "$VENV_PYTHON" "$RAG_SCRIPT_PATH" "$PLAN_INPUT" "$OUTPUT_FILE" --refdir "$REFERENCE_DIR"
+  "$VENV_PYTHON" "$RAG_SCRIPT_PATH" "$PLAN_INPUT" "$OUTPUT_FILE" --refdir "$REFERENCE_DIR" ${EXTRA_ARGS[@]+"${EXTRA_ARGS[@]}"}
 else
   echo "⚠️ Reference directory not found — running without"
-  "$VENV_PYTHON" "$RAG_SCRIPT_PATH" "$PLAN_INPUT" "$OUTPUT_FILE"
+  "$VENV_PYTHON" "$RAG_SCRIPT_PATH" "$PLAN_INPUT" "$OUTPUT_FILE" ${EXTRA_ARGS[@]+"${EXTRA_ARGS[@]}"}
+fi
+
+# Record the plan the findings now describe; delta mode diffs the next plan against it.
+# Reached only when the inspector succeeded (set -e; it also exits 1 when the LLM output
+# did not parse), so a failed run never advances it.
+if [[ -n "${PREV_PLAN_JSON:-}" ]]; then
+  if [[ "$PLAN_INPUT" == "$PLAN_JSON" ]]; then
+    cp "$PLAN_JSON" "$PREV_PLAN_JSON"
+    # Carry the column cache along (keyed by content hash) so the next delta run
+    # rebuilds the previous plan's model from it instead of re-parsing the JSON
+    if [[ -d "${PLAN_JSON%.json}.cols" ]]; then
+      rm -rf "${PREV_PLAN_JSON%.json}.cols"
+      cp -r "${PLAN_JSON%.json}.cols" "${PREV_PLAN_JSON%.json}.cols"
+    fi
+  else
+    rm -rf "$PREV_PLAN_JSON" "${PREV_PLAN_JSON%.json}.cols"  # findings are from the tfstate, not from a plan
+  fi
 fi
@@ -18,8 +18,12 @@ terraform plan -out="$PLAN_FILE"
 terraform show -json "$PLAN_FILE" > "$PLAN_JSON"
 echo "✅ Terraform plan JSON exported to $PLAN_JSON"
 
-# Export tfstate if available
-if [ -f terraform.tfstate ]; then
+# Export tfstate if available. The RAG inspector reads the raw v4 layout directly,
+# so copying avoids a second Terraform CLI start + provider schema load.
+if [ -f terraform.tfstate ] && [ "${RAW_STATE:-true}" = "true" ]; then
+  echo "📄 Found terraform.tfstate — copying raw state (no terraform show)"
+  cp terraform.tfstate "$STATE_JSON"
+elif [ -f terraform.tfstate ]; then
   echo "📄 Found terraform.tfstate — exporting to JSON"
   terraform show -json terraform.tfstate > "$STATE_JSON"
 else
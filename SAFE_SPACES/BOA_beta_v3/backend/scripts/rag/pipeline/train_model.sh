@@ -13,3 +13,10 @@ if [ ! -d "${MODEL_OUTPUT_DIR}" ]; then
 else
     echo "✅ Fine-tuned model already exists at ${MODEL_OUTPUT_DIR}."
 fi
+
+# Re-export when there is no export yet or it was made from a different (retrained) model
+if [ "${EXPORT_ONNX}" = "true" ] && \
+   ! python3 "${ONNX_EXPORT_SCRIPT}" --model "${MODEL_OUTPUT_DIR}" --out "${ONNX_MODEL_DIR}" --is-current; then
+    echo "📦 Exporting ONNX int8 embedder..."
+    python3 "${ONNX_EXPORT_SCRIPT}" --model "${MODEL_OUTPUT_DIR}" --out "${ONNX_MODEL_DIR}"
+fi
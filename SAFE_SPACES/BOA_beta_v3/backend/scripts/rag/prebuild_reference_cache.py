@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Prebuild (or prune) the extracted-text cache for a reference directory."""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+
+from backend.coldrag.utils.reference_cache import REF_TEXT_CACHE_DIR, ReferenceTextCache
+from backend.coldrag.utils.reference_loader import REF_LOADER_WORKERS, list_reference_files, load_reference_docs
+
+load_dotenv()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract and cache reference document text")
+    parser.add_argument("--refdir", default=os.getenv("REFERENCE_DIR"), help="Reference directory (default: REFERENCE_DIR)")
+    parser.add_argument("--cache-dir", default=REF_TEXT_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=REF_LOADER_WORKERS)
+    parser.add_argument("--evict-only", action="store_true", help="Only drop entries for deleted/foreign files")
+    args = parser.parse_args()
+
+    if not args.refdir:
+        parser.error("--refdir is required when REFERENCE_DIR is not set")
+
+    if not args.evict_only:
+        load_reference_docs(args.refdir, workers=args.workers, use_cache=True, cache_dir=args.cache_dir)
+
+    cache = ReferenceTextCache(args.cache_dir)
+    removed = cache.evict(keep=list_reference_files(args.refdir))
+    cache.save()
+    print(f"🧹 Evicted {removed} stale entries; {len(cache.entries)} files cached in {args.cache_dir}")